@@ -33,6 +33,7 @@ import gama.genetic_programming.compilers.scikitlearn
 from gama.genetic_programming.components import Individual, Fitness, DATA_TERMINAL
 from gama.search_methods.base_search import BaseSearch
 from gama.utilities.evaluation_library import EvaluationLibrary, Evaluation
+from gama.utilities.evaluation_store import EvaluationStore
 from gama.utilities.metrics import scoring_to_metric
 
 from gama.__version__ import __version__
@@ -55,12 +56,16 @@ from gama.genetic_programming.operations import create_random_expression
 from gama.configuration.parser import pset_from_config
 from gama.genetic_programming.operator_set import OperatorSet
 from gama.genetic_programming.compilers.scikitlearn import compile_individual
+from gama.genetic_programming.compilers.fold_cache import FoldCache
+from gama.genetic_programming.compilers.prefix_cache import PrefixCache
 from gama.postprocessing import (
     BestFitPostProcessing,
     BasePostProcessing,
     EnsemblePostProcessing,
 )
 from gama.utilities.generic.async_evaluator import AsyncEvaluator
+from gama.utilities.generic.paretofront import ParetoFront
+from gama.utilities.generic.shared_data import SharedData
 from gama.utilities.metrics import Metric
 
 # Avoid stopit from logging warnings every time a pipeline evaluation times out
@@ -99,6 +104,12 @@ class Gama(ABC):
         store: str = "logs",
         config: None = None,
         preset: str = "simple",
+        share_data: bool = False,
+        prefix_cache_mb: Optional[int] = None,
+        evaluation_store: Optional[str] = None,
+        retry_memory_errors: bool = False,
+        limit_worker_memory: bool = False,
+        backend: str = "processes",
     ):
         """
 
@@ -134,6 +145,8 @@ class Gama(ABC):
         max_eval_time: positive int, optional (default=None)
             Time in seconds that can be used to evaluate any one single individual.
             If None, set to 0.1 * max_total_time.
+            Evaluations which do not stop in time (e.g. while in non-Python code)
+            have their subprocess terminated shortly after.
 
         n_jobs: int, optional (default=None)
             The amount of parallel processes that may be created to speed up `fit`.
@@ -178,6 +191,52 @@ class Gama(ABC):
             One of:
                 - simple: Create a simple pipeline with good performance.
                 - performance: Try to get the best performing model.
+
+        share_data: bool (default=False)
+            If True, the training data is written once to a memory-mapped file in
+            `output_directory` from which all evaluation subprocesses read,
+            instead of each subprocess receiving its own copy of the data.
+            This reduces memory usage and subprocess start-up time for large data.
+
+        prefix_cache_mb: int, optional (default=None)
+            If set, each evaluation subprocess caches the fitted preprocessing steps
+            of pipelines and the data they produce for each fold, using at most
+            `prefix_cache_mb` megabytes for the data. Pipelines with the same
+            preprocessing steps then only need to fit their final estimator.
+            If None, nothing is cached.
+
+        evaluation_store: str, optional (default=None)
+            Path to an SQLite database in which the scores of evaluated pipelines are
+            stored, it is created if it does not exist. The database is kept across
+            runs. When the same data is used with the same metrics, pipelines found
+            in the database are not evaluated again, and the best pipelines from
+            earlier runs are used to start the search if `warm_start` is not given.
+            Reused evaluations have no predictions, so they can not be part of an
+            ensemble. If None, scores are not stored.
+
+        retry_memory_errors: bool (default=False)
+            If True, an evaluation which is terminated because it used too much memory
+            (see `max_memory_mb`) is evaluated once more with half the training data
+            of each fold. Otherwise, it is reported as failed with a MemoryError.
+
+        limit_worker_memory: bool (default=False)
+            If True and `max_memory_mb` is set, the operating system limits the address
+            space of each evaluation subprocess to `max_memory_mb / n_jobs` megabytes.
+            Pipelines which need more memory then fail with a MemoryError right away,
+            instead of being terminated after the total memory use is found too high.
+            Address space also counts reserved and memory-mapped memory, so the limit
+            is met before that much memory is used. Only works on Unix-like systems.
+
+        backend: str (default="processes")
+            Evaluate pipelines in "processes" or "threads" (`n_jobs` of them).
+            Threads share the data and pass pipelines, predictions and fitted models
+            without copying them, which is faster for small datasets or learners
+            which release the GIL. Threads can not be terminated, so `max_memory_mb`
+            is not enforced and evaluations may exceed `max_eval_time` when stuck
+            in non-Python code.
+            With "tcp://host:port", pipelines are evaluated by agents started with
+            the `gama-worker` command, which may run on other machines.
+            See `AsyncEvaluator` for details.
         """
         if config:
             warnings.warn(
@@ -242,10 +301,25 @@ class Gama(ABC):
             err = f"Expect None or positive int for max_eval_time, got {max_eval_time}."
         if n_jobs < -1 or n_jobs == 0:
             err = f"n_jobs should be -1 or positive int but is {n_jobs}."
+        if prefix_cache_mb is not None and prefix_cache_mb <= 0:
+            err = f"Expect None or positive prefix_cache_mb, got {prefix_cache_mb}."
+        if backend not in ["processes", "threads"] and not backend.startswith("tcp://"):
+            err = (
+                f"backend should be 'processes', 'threads' or 'tcp://..', is {backend}."
+            )
         if err:
             self.cleanup("all")
             raise ValueError(err)
 
+        if max_eval_time is None:
+            max_eval_time = round(0.1 * max_total_time)
+        if max_eval_time > max_total_time:
+            log.warning(
+                f"max_eval_time ({max_eval_time}) > max_total_time ({max_total_time}) "
+                f"is not allowed. max_eval_time set to {max_total_time}."
+            )
+            max_eval_time = max_total_time
+
         setattr(
             AsyncEvaluator,
             "__init__",
@@ -254,18 +328,18 @@ class Gama(ABC):
                 n_workers=n_jobs,
                 memory_limit_mb=max_memory_mb,
                 logfile=os.path.join(self.output_directory, "memory.log"),
+                # Evaluations stop themselves after `max_eval_time` seconds, but can
+                # not interrupt e.g. C code, so their process is terminated later.
+                time_limit=1.2 * max_eval_time + 5,
+                worker_memory_limit_mb=(
+                    max_memory_mb // n_jobs
+                    if limit_worker_memory and max_memory_mb is not None
+                    else None
+                ),
+                backend=backend,
             ),
         )
 
-        if max_eval_time is None:
-            max_eval_time = round(0.1 * max_total_time)
-        if max_eval_time > max_total_time:
-            log.warning(
-                f"max_eval_time ({max_eval_time}) > max_total_time ({max_total_time}) "
-                f"is not allowed. max_eval_time set to {max_total_time}."
-            )
-            max_eval_time = max_total_time
-
         self._max_eval_time = max_eval_time
         self._time_manager = TimeKeeper(max_total_time)
         self._metrics: Tuple[Metric, ...] = scoring_to_metric(scoring)
@@ -273,6 +347,12 @@ class Gama(ABC):
         self._search_method: BaseSearch = search
         self._post_processing = post_processing
         self._store = store
+        self._share_data = share_data
+        if share_data and backend.startswith("tcp://"):
+            log.warning("Data can not be shared with remote workers, it is copied.")
+            self._share_data = False
+        self._prefix_cache_mb = prefix_cache_mb
+        self._evaluation_store = evaluation_store
 
         if random_state is not None:
             random.seed(random_state)
@@ -333,6 +413,8 @@ class Gama(ABC):
             eliminate=eliminate_from_pareto,
             evaluate_callback=self._on_evaluation_completed,
             completed_evaluations=self._evaluation_library.lookup,
+            retry_memory_errors=retry_memory_errors,
+            max_eval_time=max_eval_time,
         )
 
     def cleanup(self, which="evaluations") -> None:
@@ -623,6 +705,12 @@ class Gama(ABC):
         self, warm_start: Optional[List[Individual]] = None, timeout: float = 1e6
     ) -> None:
         """Invoke the search algorithm, populate `final_pop`."""
+        store = None
+        if self._evaluation_store is not None:
+            store = EvaluationStore(
+                self._evaluation_store, self._x, self._y, self._metrics
+            )
+
         if warm_start:
             if not all(isinstance(i, Individual) for i in warm_start):
                 raise TypeError("`warm_start` must be a list of Individual.")
@@ -630,17 +718,37 @@ class Gama(ABC):
         elif warm_start is None and len(self._final_pop) > 0:
             pop = self._final_pop
         else:
-            pop = [self._operator_set.individual() for _ in range(50)]
+            pop = [] if store is None else self._stored_pareto_front(store, n=50)
+            pop += [self._operator_set.individual() for _ in range(50 - len(pop))]
 
         deadline = time.time() + timeout
 
+        x: Union[pd.DataFrame, SharedData] = self._x
+        y: Union[pd.Series, SharedData] = self._y
+        if self._share_data:
+            try:
+                x = SharedData(self._x, os.path.join(self.output_directory, "x.dat"))
+                y = SharedData(self._y, os.path.join(self.output_directory, "y.dat"))
+            except TypeError as e:
+                log.warning(f"Can not share data, every process gets a copy: {e}")
+                x, y = self._x, self._y
+
         evaluate_pipeline = partial(
             gama.genetic_programming.compilers.scikitlearn.evaluate_pipeline,
-            x=self._x,
-            y_train=self._y,
+            x=x,
+            y_train=y,
             metrics=self._metrics,
         )
         AsyncEvaluator.defaults = dict(evaluate_pipeline=evaluate_pipeline)
+        if self._prefix_cache_mb is not None:
+            AsyncEvaluator.defaults["prefix_cache"] = PrefixCache(self._prefix_cache_mb)
+        if store is not None:
+            AsyncEvaluator.defaults["evaluation_store"] = store
+        fold_cache = None
+        if self._search_method.uses_fold_cache:
+            # Folds evaluated on a low rung of e.g. ASHA are reused on higher rungs.
+            fold_cache = FoldCache(os.path.join(self.output_directory, "folds"))
+            AsyncEvaluator.defaults["fold_cache"] = fold_cache
 
         self._operator_set.evaluate = partial(
             gama.genetic_programming.compilers.scikitlearn.evaluate_individual,
@@ -648,6 +756,11 @@ class Gama(ABC):
             deadline=deadline,
             add_length_to_score=self._regularize_length,
         )
+        self._operator_set.failed_evaluation = partial(
+            gama.genetic_programming.compilers.scikitlearn.failed_evaluation,
+            n_metrics=len(self._metrics),
+            add_length_to_score=self._regularize_length,
+        )
 
         try:
             with stopit.ThreadingTimeout(timeout):
@@ -655,11 +768,39 @@ class Gama(ABC):
                 self._search_method.search(self._operator_set, start_candidates=pop)
         except KeyboardInterrupt:
             log.info("Search phase terminated because of Keyboard Interrupt.")
+        finally:
+            for data in [x, y]:
+                if isinstance(data, SharedData):
+                    data.remove()
+            if fold_cache is not None:
+                fold_cache.clear()
 
         self._final_pop = self._search_method.output
         n_evaluations = len(self._evaluation_library.evaluations)
         log.info(f"Search phase evaluated {n_evaluations} individuals.")
 
+    def _stored_pareto_front(self, store: EvaluationStore, n: int) -> List[Individual]:
+        """Pareto front of at most `n` pipelines in `store` of the current search space.
+
+        If the front is larger than `n`, the pipelines with the best score are used.
+        """
+        front = ParetoFront(get_values_fn=lambda ind: ind.fitness.values)
+        for pipeline, score in store.all_scores():
+            try:
+                individual = Individual.from_string(
+                    pipeline, self._pset, self._operator_set._safe_compile
+                )
+            except (IndexError, RuntimeError, ValueError):
+                continue  # The pipeline is not in the current search space.
+            if self._regularize_length:
+                score = score + (-len(individual.primitives),)
+            individual.fitness = Fitness(score, None, 0, 0)
+            individual.meta["origin"] = "store"
+            front.update(individual)
+        best = sorted(front, key=lambda ind: ind.fitness.values, reverse=True)[:n]
+        log.info(f"Starting search with {len(best)} pipelines from the store.")
+        return best
+
     def export_script(
         self, file: Optional[str] = "gama_pipeline.py", raise_if_exists: bool = False
     ) -> str:
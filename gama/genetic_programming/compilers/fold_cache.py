@@ -0,0 +1,83 @@
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+from typing import Any, Hashable, List, NamedTuple, Optional, Union
+import uuid
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class CachedFold(NamedTuple):
+    """The fitted pipeline, scores and predictions of one cross-validation fold."""
+
+    estimator: Any
+    scores: List[float]
+    predictions: np.ndarray
+
+
+class FittedEstimator(NamedTuple):
+    """The final step of a pipeline fitted on the first `n_rows` of a subsample."""
+
+    n_rows: int
+    estimator: Any
+
+
+class FoldCache:
+    """Stores evaluated cross-validation folds on disk, so they are not evaluated again.
+
+    When a pipeline is first evaluated on only some of the folds, e.g. on a low rung
+    of successive halving, the evaluation on more folds can load the folds evaluated
+    before. Because the folds are stored in files, they are available to all
+    processes which can access `directory`, regardless of which evaluated them.
+    Final steps fit on a subsample are stored likewise (as `FittedEstimator`), so an
+    evaluation on a larger subsample can continue training them.
+
+    Parameters
+    ----------
+    directory: str
+        Directory to store the folds in, it is created when the first fold is stored.
+    """
+
+    per_worker = True  # See `AsyncEvaluator`, worker threads count their own hits.
+
+    def __init__(self, directory: str):
+        self._directory = directory
+        self.hits = 0
+
+    def _path(self, key: Hashable) -> str:
+        name = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self._directory, f"{name}.pkl")
+
+    def get(self, key: Hashable) -> Optional[Union[CachedFold, FittedEstimator]]:
+        """Return the fold stored for `key`, or None if there is none."""
+        try:
+            with open(self._path(key), "rb") as fh:
+                fold = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        self.hits += 1
+        return fold
+
+    def put(self, key: Hashable, fold: Union[CachedFold, FittedEstimator]) -> None:
+        """Store `fold` for `key`, other processes never read a partial file.
+
+        If the fold can not be written, e.g. the directory is not available on a
+        remote machine, it is not stored.
+        """
+        path = self._path(key)
+        temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(self._directory, exist_ok=True)
+            with open(temporary, "wb") as fh:
+                pickle.dump(fold, fh)
+            os.replace(temporary, path)
+        except OSError as e:
+            log.debug(f"Could not store fold: {e}")
+
+    def clear(self) -> None:
+        """Remove all stored folds and the directory."""
+        shutil.rmtree(self._directory, ignore_errors=True)
@@ -0,0 +1,89 @@
+from collections import OrderedDict
+import sys
+from typing import Any, Hashable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+
+class CachedPrefix(NamedTuple):
+    """Fitted preprocessing steps and the data they produced for one fold."""
+
+    steps: List[Tuple[str, Any]]
+    x_train: Any
+    x_test: Any
+
+
+def _nbytes(data: Any) -> int:
+    """Approximate the number of bytes used by the (transformed) data."""
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if scipy.sparse.issparse(data):
+        return sum(
+            getattr(data, attr).nbytes
+            for attr in ["data", "indices", "indptr", "row", "col"]
+            if hasattr(data, attr)
+        )
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return int(np.sum(data.memory_usage(deep=False)))
+    return sys.getsizeof(data)
+
+
+class PrefixCache:
+    """A least-recently-used cache of fitted pipeline prefixes and transformed folds.
+
+    Many pipelines share the same preprocessing steps and only differ in their final
+    estimator. If the preprocessing steps for a fold are found in the cache, only the
+    final estimator needs to be fit.
+    The size of the cache is bounded by the memory used by the transformed data,
+    the memory used by the fitted preprocessing steps themselves is not counted.
+    Each (sub)process or worker thread uses its own cache.
+
+    Parameters
+    ----------
+    max_mb: float
+        Maximum number of megabytes of transformed data to keep in the cache.
+    """
+
+    per_worker = True  # See `AsyncEvaluator`, worker threads get their own copy.
+
+    def __init__(self, max_mb: float):
+        self._max_bytes = max_mb * (2**20)
+        self._entries: "OrderedDict[Hashable, Tuple[CachedPrefix, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self):
+        # Each process starts with an empty cache, do not send over cached data.
+        state = self.__dict__.copy()
+        state.update(_entries=OrderedDict(), _bytes=0, hits=0, misses=0)
+        return state
+
+    def get(self, key: Hashable) -> Optional[CachedPrefix]:
+        """Return the cached prefix for `key` if it exists, and record a hit or miss."""
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        prefix, _ = self._entries[key]
+        return prefix
+
+    def put(self, key: Hashable, prefix: CachedPrefix) -> None:
+        """Cache `prefix`, evicting least recently used entries if required."""
+        size = _nbytes(prefix.x_train) + _nbytes(prefix.x_test)
+        if size > self._max_bytes:
+            return
+        if key in self._entries:
+            _, old_size = self._entries.pop(key)
+            self._bytes -= old_size
+        while self._entries and self._bytes + size > self._max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+        self._entries[key] = (prefix, size)
+        self._bytes += size
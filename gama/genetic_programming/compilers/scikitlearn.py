@@ -1,28 +1,38 @@
 from datetime import datetime
 import logging
+import math
 import os
 import time
-from typing import Callable, Tuple, Optional, Sequence
+from typing import Callable, Dict, Tuple, Optional, Sequence, Union
 
+import scipy.stats
 import stopit
-from sklearn.base import TransformerMixin, is_classifier
-from sklearn.model_selection import (
-    ShuffleSplit,
-    cross_validate,
-    check_cv,
-    StratifiedShuffleSplit,
-)
+from sklearn.base import TransformerMixin, clone, is_classifier
+from sklearn.model_selection import check_cv
 from sklearn.pipeline import Pipeline
 
+from gama.genetic_programming.compilers.fold_cache import (
+    CachedFold,
+    FittedEstimator,
+    FoldCache,
+)
+from gama.genetic_programming.compilers.prefix_cache import CachedPrefix, PrefixCache
 from gama.utilities.evaluation_library import Evaluation
+from gama.utilities.evaluation_store import EvaluationStore
+from gama.utilities.generic.shared_data import SharedData
 from gama.utilities.generic.stopwatch import Stopwatch
 import numpy as np
+import pandas as pd
 from gama.utilities.metrics import Metric
 from gama.genetic_programming.components import Individual, PrimitiveNode, Fitness
 
 log = logging.getLogger(__name__)
 
 
+class RaceAborted(Exception):
+    """Evaluation stopped early as the pipeline can not reach the race threshold."""
+
+
 def primitive_node_to_sklearn(primitive_node: PrimitiveNode) -> object:
     hyperparameters = {
         terminal.output: terminal.value for terminal in primitive_node._terminals
@@ -56,15 +66,49 @@ def object_is_valid_pipeline(o: object) -> bool:
 
 def evaluate_pipeline(
     pipeline,
-    x,
-    y_train,
+    x: Union[pd.DataFrame, SharedData],
+    y_train: Union[pd.Series, SharedData],
     timeout: float,
     metrics: Tuple[Metric],
     cv=5,
     subsample=None,
+    prefix_cache: Optional[PrefixCache] = None,
+    prefix_key: Optional[str] = None,
+    race_threshold: Optional[float] = None,
+    race_confidence: float = 0.95,
+    n_folds: Optional[Union[int, float]] = None,
+    fold_cache: Optional[FoldCache] = None,
+    fold_key: Optional[str] = None,
+    warm_start: bool = False,
 ) -> Tuple:
     """Score `pipeline` with k-fold CV according to `metrics` on (a subsample of) X, y
 
+    If both `prefix_cache` and `prefix_key` are provided and `cv` is an int,
+    the fitted preprocessing steps (all but the last step of `pipeline`) and the data
+    they produce are looked up in and stored to `prefix_cache` by fold.
+    The `prefix_key` must uniquely identify the preprocessing steps.
+
+    If `race_threshold` is set, evaluation stops after any fold (from the second on)
+    once the one-sided `race_confidence` upper bound on the mean score of the first
+    metric is below `race_threshold`. The scores of the evaluated folds are then
+    returned together with a `RaceAborted` error, without predictions or estimators.
+
+    If `n_folds` is set, only the first `n_folds` folds are evaluated (if a float,
+    that fraction of the folds, rounded up). Not all rows are then predicted,
+    so no predictions are returned.
+    If both `fold_cache` and `fold_key` are provided and `cv` is an int, folds stored
+    in `fold_cache` are not evaluated again, and when only the first `n_folds` are
+    evaluated the evaluated folds are stored. The `fold_key` must uniquely identify
+    the pipeline. Folds of evaluations on a subsample are not stored nor looked up,
+    as evaluations on more folds are expected to use a larger subsample.
+
+    The subsample of each training fold is a prefix of a fixed ordering of its rows,
+    so the subsample of a larger `subsample` contains that of a smaller one.
+    If `warm_start` is set and the fold cache is used, the final step of a pipeline
+    evaluated on a subsample is stored by fold if it can continue training, and an
+    evaluation on a larger subsample continues training it instead of fitting the
+    final step from scratch, see `_fit_estimator`.
+
     Returns
     -------
     Tuple:
@@ -77,6 +121,10 @@ def evaluate_pipeline(
         raise TypeError("Pipeline must not be None and requires fit, predict, steps.")
     if timeout <= 0:
         raise ValueError(f"`timeout` must be greater than 0, is {timeout}.")
+    if isinstance(x, SharedData):
+        x = x.data
+    if isinstance(y_train, SharedData):
+        y_train = y_train.data
 
     prediction, estimators = None, None
     # default score for e.g. timeout or failure
@@ -92,51 +140,126 @@ def evaluate_pipeline(
                 isinstance(subsample, int) and subsample < len(y_train)
             ) or (isinstance(subsample, float) and subsample < 1.0)
 
-            if require_subsample:
+            use_fold_cache = (
+                fold_cache is not None and fold_key is not None and isinstance(cv, int)
+            )
+            use_warm_start = warm_start and use_fold_cache
+            # Evaluations on more folds (e.g. a higher rung of successive halving)
+            # on a subsample use a larger one, so they never reuse its folds.
+            reuse_folds = use_fold_cache and not require_subsample
+
+            if require_subsample or use_warm_start:
                 # We subsample the training sets, but not the test sets.
                 # This allows for performance comparisons across subsample levels.
-                new_splits = []
-                for train, test in splitter.split(x, y_train):
-                    if is_classification:
-                        sampler = StratifiedShuffleSplit(
-                            n_splits=1, train_size=subsample, random_state=0
+                # With warm start all rows are ordered as well, so that the rows of
+                # any subsample come first.
+                size = subsample if require_subsample else 1.0
+                splitter = [
+                    (_subsample(train, y_train, size, is_classification), test)
+                    for train, test in splitter.split(x, y_train)
+                ]
+
+            if prefix_cache is not None and prefix_key is not None:
+                # Only integer `cv` is guaranteed to produce the same folds each call.
+                use_cache = isinstance(cv, int) and len(pipeline.steps) > 1
+            else:
+                use_cache = False
+
+            if any(m.requires_probabilities for m in metrics):
+                predict_method = "predict_proba"
+            else:
+                predict_method = "predict"
+
+            splits = (
+                splitter
+                if isinstance(splitter, list)
+                else list(splitter.split(x, y_train))
+            )
+            if n_folds is not None:
+                if isinstance(n_folds, float):
+                    n_folds = math.ceil(n_folds * len(splits))
+                n_folds = max(1, n_folds)
+            is_partial = n_folds is not None and n_folds < len(splits)
+            fold_scores, fold_estimators, fold_predictions = [], [], None
+            for fold, (train, test) in enumerate(splits[:n_folds]):
+                cache_key = (fold_key, subsample, fold)
+                cached = fold_cache.get(cache_key) if reuse_folds else None
+                if cached is not None:
+                    fold_estimators.append(cached.estimator)
+                    fold_scores.append(cached.scores)
+                    fold_pred = cached.predictions
+                else:
+                    warm_key = (fold_key, "warm_start", fold)
+                    previous = fold_cache.get(warm_key) if use_warm_start else None
+                    if use_cache or previous is not None:
+                        fold_estimator, estimator, x_test = _fit_with_prefix_cache(
+                            pipeline,
+                            x,
+                            y_train,
+                            train,
+                            test,
+                            prefix_cache if use_cache else None,
+                            key=(fold, subsample, prefix_key),
+                            previous=previous,
                         )
                     else:
-                        sampler = ShuffleSplit(
-                            n_splits=1, train_size=subsample, random_state=0
+                        fold_estimator = clone(pipeline)
+                        fold_estimator.fit(x.iloc[train, :], y_train.iloc[train])
+                        estimator, x_test = fold_estimator, x.iloc[test, :]
+                    fold_estimators.append(fold_estimator)
+
+                    final_step = fold_estimator.steps[-1][1]
+                    has_preprocessing = len(fold_estimator.steps) > 1
+                    if (
+                        use_warm_start
+                        and require_subsample
+                        and _continues_training(final_step, has_preprocessing)
+                    ):
+                        # Evaluations on a larger subsample may continue from it.
+                        fold_cache.put(
+                            warm_key, FittedEstimator(len(train), final_step)
                         )
-                    full_train_x, full_train_y = x.iloc[train, :], y_train[train]
-                    subsample_idx, _ = next(sampler.split(full_train_x, full_train_y))
-                    new_splits.append((subsample_idx, test))
-                splitter = new_splits
-
-            result = cross_validate(
-                pipeline,
-                x,
-                y_train,
-                cv=splitter,
-                return_estimator=True,
-                scoring=dict([(m.name, m) for m in metrics]),
-                error_score="raise",
-            )
-            scores = tuple(np.mean(result[f"test_{m.name}"]) for m in metrics)
-            estimators = result["estimator"]
 
-            splitter = (
-                splitter if isinstance(splitter, list) else splitter.split(x, y_train)
-            )
-            for estimator, (_, test) in zip(estimators, splitter):
-                if any(m.requires_probabilities for m in metrics):
-                    fold_pred = estimator.predict_proba(x.iloc[test, :])
-                else:
-                    fold_pred = estimator.predict(x.iloc[test, :])
+                    # All metrics and the out-of-fold predictions share predictions,
+                    # so the estimator predicts on the test fold at most once each.
+                    memoized = _MemoizedPredictions(estimator)
+                    y_test = y_train.iloc[test]
+                    fold_scores.append([m(memoized, x_test, y_test) for m in metrics])
+
+                if race_threshold is not None and _below_threshold(
+                    [score for score, *_ in fold_scores],
+                    race_threshold,
+                    race_confidence,
+                ):
+                    n_evaluated = len(fold_scores)
+                    return (
+                        None,
+                        tuple(np.mean(fold_scores, axis=0)),
+                        None,
+                        RaceAborted(f"Aborted after {n_evaluated} folds."),
+                    )
 
-                if prediction is None:
+                if cached is None:
+                    fold_pred = getattr(memoized, predict_method)(x_test)
+                    if reuse_folds and is_partial:
+                        # Evaluations on more folds may start from this fold.
+                        fold_cache.put(
+                            cache_key,
+                            CachedFold(fold_estimators[-1], fold_scores[-1], fold_pred),
+                        )
+                if fold_predictions is None:
                     if fold_pred.ndim == 2:
-                        prediction = np.empty(shape=(len(y_train), fold_pred.shape[1]))
+                        shape: Tuple[int, ...] = (len(y_train), fold_pred.shape[1])
                     else:
-                        prediction = np.empty(shape=(len(y_train),))
-                prediction[test] = fold_pred
+                        shape = (len(y_train),)
+                    fold_predictions = np.empty(shape=shape)
+                fold_predictions[test] = fold_pred
+
+            if is_partial:
+                # Rows of the folds which were not evaluated have no predictions.
+                fold_predictions = None
+            scores = tuple(np.mean(fold_scores, axis=0))
+            prediction, estimators = fold_predictions, fold_estimators
 
         except stopit.TimeoutException:
             # This exception is handled by the ThreadingTimeout context manager.
@@ -158,12 +281,161 @@ def evaluate_pipeline(
     )
 
 
+def _below_threshold(
+    scores: Sequence[float], threshold: float, confidence: float
+) -> bool:
+    """True if the `confidence` upper bound on the mean of `scores` is below threshold.
+
+    The bound assumes scores are normally distributed, as in a one-sided t-test.
+    At least two scores are required to estimate their variance.
+    """
+    if len(scores) < 2:
+        return False
+    mean, std = np.mean(scores), np.std(scores, ddof=1)
+    if not np.isfinite(mean) or not np.isfinite(std):
+        return False
+    t = scipy.stats.t.ppf(confidence, df=len(scores) - 1)
+    return bool(mean + t * std / np.sqrt(len(scores)) < threshold)
+
+
+def _subsample(
+    train: np.ndarray,
+    y: pd.Series,
+    subsample: Union[int, float],
+    is_classification: bool,
+) -> np.ndarray:
+    """Select `subsample` rows of the `train` fold, a fraction if it is a float.
+
+    The rows are always the first of the same random ordering of `train`, so a
+    larger subsample extends a smaller one with the rows after it.
+    For classification, rows are ordered by their relative position within their
+    class, so that each subsample has about the class distribution of the fold.
+    """
+    order = np.random.RandomState(0).permutation(len(train))
+    if is_classification:
+        labels = y.iloc[train].to_numpy()[order]
+        position = np.empty(len(order))
+        for label in np.unique(labels):
+            in_class = np.flatnonzero(labels == label)
+            position[in_class] = (np.arange(len(in_class)) + 0.5) / len(in_class)
+        order = order[np.argsort(position, kind="stable")]
+    if isinstance(subsample, float):
+        subsample = int(subsample * len(train))
+    return train[order[: max(1, subsample)]]
+
+
+def _continues_training(estimator: object, has_preprocessing: bool) -> bool:
+    """True if fitted `estimator` can continue training on a larger subsample."""
+    if "warm_start" in estimator.get_params():
+        # Estimators which start from their previous coefficients fit all rows again,
+        # while ensembles would only add members, exceeding their `n_estimators`.
+        return hasattr(estimator, "coef_") or hasattr(estimator, "coefs_")
+    # `partial_fit` only learns the new rows, which is only correct if the features
+    # of the earlier rows did not change, but preprocessing is fit again.
+    return hasattr(estimator, "partial_fit") and not has_preprocessing
+
+
+def _fit_estimator(
+    estimator: object,
+    x_train: object,
+    y_train: pd.Series,
+    previous: Optional[FittedEstimator] = None,
+) -> object:
+    """Fit `estimator`, or continue training the estimator stored in `previous`.
+
+    The rows `previous` was fit on must be the first `previous.n_rows` of `x_train`.
+    An estimator with a `warm_start` parameter fits all rows starting from its
+    previous fit, one which supports `partial_fit` is updated with the new rows only.
+    """
+    if previous is None or previous.n_rows >= len(y_train):
+        return estimator.fit(x_train, y_train)
+    estimator = previous.estimator
+    if "warm_start" in estimator.get_params():
+        warm_start = estimator.warm_start
+        estimator.set_params(warm_start=True).fit(x_train, y_train)
+        return estimator.set_params(warm_start=warm_start)
+    new_rows = slice(previous.n_rows, None)
+    if isinstance(x_train, pd.DataFrame):
+        return estimator.partial_fit(x_train.iloc[new_rows], y_train.iloc[new_rows])
+    return estimator.partial_fit(x_train[new_rows], y_train.iloc[new_rows])
+
+
+def _fit_with_prefix_cache(
+    pipeline: Pipeline,
+    x: pd.DataFrame,
+    y: pd.Series,
+    train: np.ndarray,
+    test: np.ndarray,
+    prefix_cache: Optional[PrefixCache],
+    key: Tuple,
+    previous: Optional[FittedEstimator] = None,
+) -> Tuple[Pipeline, object, object]:
+    """Fit `pipeline` on the train fold, fitting preprocessing only if not cached.
+
+    Without `prefix_cache` the preprocessing is always fit. The final step continues
+    training from `previous` if it is given, see `_fit_estimator`.
+
+    Returns
+    -------
+    Tuple:
+        pipeline: the fitted pipeline
+        estimator: the fitted final step of the pipeline
+        x_test: the test fold as transformed by the preprocessing steps
+    """
+    *prefix_steps, (name, estimator) = clone(pipeline).steps
+    prefix = prefix_cache.get(key) if prefix_cache is not None else None
+    if prefix is None and not prefix_steps:
+        prefix = CachedPrefix([], x.iloc[train, :], x.iloc[test, :])
+    elif prefix is None:
+        preprocessing = Pipeline(prefix_steps)
+        x_train = preprocessing.fit_transform(x.iloc[train, :], y.iloc[train])
+        x_test = preprocessing.transform(x.iloc[test, :])
+        prefix = CachedPrefix(preprocessing.steps, x_train, x_test)
+        if prefix_cache is not None:
+            prefix_cache.put(key, prefix)
+
+    estimator = _fit_estimator(estimator, prefix.x_train, y.iloc[train], previous)
+    fitted_pipeline = Pipeline([*prefix.steps, (name, estimator)])
+    return fitted_pipeline, estimator, prefix.x_test
+
+
+class _MemoizedPredictions:
+    """Wraps a fitted estimator and remembers the result of its prediction methods.
+
+    Scorers may be called with this object instead of the estimator, so that
+    multiple metrics do not each make their own predictions.
+    Every call to a prediction method is assumed to be made with the same data.
+    """
+
+    _prediction_methods = {"predict", "predict_proba", "decision_function"}
+
+    def __init__(self, estimator):
+        self._estimator = estimator
+        self._predictions: Dict[str, np.ndarray] = {}
+
+    def __getattr__(self, name: str):
+        # Only called for attributes not found normally, e.g. `classes_`.
+        attribute = getattr(self._estimator, name)
+        if name not in self._prediction_methods:
+            return attribute
+
+        def memoized_prediction(x):
+            if name not in self._predictions:
+                self._predictions[name] = attribute(x)
+            return self._predictions[name]
+
+        return memoized_prediction
+
+
 def evaluate_individual(
     individual: Individual,
     evaluate_pipeline: Callable,
     timeout: float = 1e6,
     deadline: Optional[float] = None,
     add_length_to_score: bool = True,
+    prefix_cache: Optional[PrefixCache] = None,
+    evaluation_store: Optional[EvaluationStore] = None,
+    fold_cache: Optional[FoldCache] = None,
     **kwargs,
 ) -> Evaluation:
     """Evaluate the pipeline specified by individual, and record
@@ -184,6 +456,17 @@ def evaluate_individual(
         Cut off evaluation at `deadline` even if `timeout` seconds have not yet elapsed.
     add_length_to_score: bool (default=True)
         Add the length of the individual to the score result of the evaluation.
+    prefix_cache: PrefixCache, optional (default=None)
+        If set, it is passed to `evaluate_pipeline` together with a key that
+        identifies the preprocessing steps of the individual.
+    evaluation_store: EvaluationStore, optional (default=None)
+        If set, scores are read from the store if the pipeline was evaluated before,
+        in which case the evaluation has no predictions or estimators.
+        Otherwise, scores of a successful evaluation are saved to the store.
+        Evaluations on only some of the folds (see `n_folds`) do not use the store.
+    fold_cache: FoldCache, optional (default=None)
+        If set, it is passed to `evaluate_pipeline` together with a key that
+        identifies the pipeline of the individual.
     **kwargs: Dict, optional (default=None)
         Passed to `evaluate_pipeline` function.
 
@@ -199,13 +482,49 @@ def evaluate_individual(
         time_to_deadline = deadline - time.time()
         timeout = min(timeout, time_to_deadline)
 
+    if prefix_cache is not None:
+        kwargs.update(
+            prefix_cache=prefix_cache,
+            prefix_key=individual.structure_key[1:],
+        )
+        hits, misses = prefix_cache.hits, prefix_cache.misses
+
+    if fold_cache is not None:
+        kwargs.update(fold_cache=fold_cache, fold_key=individual.pipeline_str())
+        fold_hits = fold_cache.hits
+
+    if kwargs.get("n_folds") is not None:
+        evaluation_store = None  # The store only holds scores over all folds.
+    stored_score = None
+    if evaluation_store is not None:
+        pipeline_str = individual.pipeline_str()
+        stored_score = evaluation_store.get(pipeline_str, kwargs.get("subsample"))
+
     with Stopwatch() as wall_time, Stopwatch(time.process_time) as process_time:
-        evaluation = evaluate_pipeline(individual.pipeline, timeout=timeout, **kwargs)
-        result._predictions, result.score, result._estimators, error = evaluation
-        if error is not None:
-            result.error = f"{type(error)} {str(error)}"
+        if stored_score is not None:
+            result.score = stored_score
+        else:
+            evaluation = evaluate_pipeline(
+                individual.pipeline, timeout=timeout, **kwargs
+            )
+            result._predictions, result.score, result._estimators, error = evaluation
+            result.race_aborted = isinstance(error, RaceAborted)
+            if error is not None:
+                result.error = f"{type(error)} {str(error)}"
     result.duration = wall_time.elapsed_time
 
+    if evaluation_store is not None and stored_score is None and result.error is None:
+        evaluation_store.save(
+            pipeline_str, result.score, result.duration, kwargs.get("subsample")
+        )
+
+    if prefix_cache is not None:
+        result.cache_hits = prefix_cache.hits - hits
+        result.cache_misses = prefix_cache.misses - misses
+    result.reused = stored_score is not None or (
+        fold_cache is not None and fold_cache.hits > fold_hits
+    )
+
     if add_length_to_score:
         result.score = result.score + (-len(individual.primitives),)
     individual.fitness = Fitness(
@@ -216,3 +535,22 @@ def evaluate_individual(
     )
 
     return result
+
+
+def failed_evaluation(
+    individual: Individual,
+    error: Exception,
+    n_metrics: int,
+    add_length_to_score: bool = True,
+) -> Evaluation:
+    """Evaluation of `individual` whose evaluation was terminated before returning.
+
+    It has the scores of a failed evaluation, and `error` as its error.
+    """
+    result = Evaluation(individual, start_time=datetime.now(), duration=0)
+    result.error = f"{type(error)} {str(error)}"
+    result.score = tuple([float("-inf")] * n_metrics)
+    if add_length_to_score:
+        result.score = result.score + (-len(individual.primitives),)
+    individual.fitness = Fitness(result.score, result.start_time, 0, 0)
+    return result
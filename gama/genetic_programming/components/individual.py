@@ -1,5 +1,5 @@
 import uuid
-from typing import List, Callable, Optional, Dict, Any
+from typing import List, Callable, Optional, Dict, Any, Tuple
 
 from sklearn.pipeline import Pipeline
 
@@ -56,6 +56,14 @@ class Individual:
             [str(primitive._primitive) for primitive in reversed(self.primitives)]
         )
 
+    @property
+    def structure_key(self) -> Tuple[str, ...]:
+        """Identifies the pipeline structure, individuals with equal keys are equal.
+
+        Use this rather than `pipeline_str` to check for duplicate pipelines.
+        """
+        return self.main_node.structure_key
+
     def pipeline_str(self) -> str:
         """str: e.g., "BernoulliNB(Binarizer(data, Binarizer.threshold=0.6), BernoulliNB.alpha=1.0)" """  # noqa: E501
         return str(self.main_node)
@@ -96,6 +104,7 @@ class Individual:
                         f"New: {new_terminal.identifier}."
                     )
                 primitive._terminals[position - scan_position] = new_terminal
+                primitive.clear_node_key()
                 return
             else:
                 scan_position += len(primitive._terminals)
@@ -1,4 +1,4 @@
-from typing import List, Union, cast
+from typing import Any, List, Optional, Tuple, Union, cast
 from .terminal import DATA_TERMINAL, Terminal
 from .primitive import Primitive
 
@@ -26,6 +26,11 @@ class PrimitiveNode:
         self._data_node = data_node
         self._terminals = sorted(terminals, key=lambda t: str(t))
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in ["_primitive", "_data_node", "_terminals"]:
+            self.__dict__["_node_key"] = None
+        super().__setattr__(name, value)
+
     def __str__(self) -> str:
         """Recursively stringify all primitive nodes (primitive and hyperparameters).
 
@@ -48,6 +53,39 @@ class PrimitiveNode:
         terminal_str = ", ".join([str(terminal) for terminal in self._terminals])
         return f"{self._primitive}({terminal_str})"
 
+    @property
+    def node_key(self) -> str:
+        """Describes the primitive and its terminals, but not the data node.
+
+        The value is cached. Assigning a new primitive, data node or list of
+        terminals clears it, in-place changes to the list of terminals require
+        a call to `clear_node_key`.
+        """
+        node_key: Optional[str] = self.__dict__.get("_node_key")
+        if node_key is None:
+            terminal_str = ", ".join([repr(terminal) for terminal in self._terminals])
+            node_key = f"{self._primitive}({terminal_str})"
+            self.__dict__["_node_key"] = node_key
+        return node_key
+
+    def clear_node_key(self) -> None:
+        """Clear the cached `node_key`, required after changing terminals in-place."""
+        self.__dict__["_node_key"] = None
+
+    @property
+    def structure_key(self) -> Tuple[str, ...]:
+        """Identifies the structure of this node and all its data nodes.
+
+        Two nodes have the same key if and only if they have the same string
+        representation, but the key is much cheaper to compute and compare.
+        """
+        node: Union[PrimitiveNode, str] = self
+        key = []
+        while isinstance(node, PrimitiveNode):
+            key.append(node.node_key)
+            node = node._data_node
+        return tuple(key)
+
     def copy(self) -> "PrimitiveNode":
         """Copies the object. Shallow for terminals, deep for data_node."""
         if isinstance(self._data_node, str) and self._data_node == DATA_TERMINAL:
@@ -4,10 +4,12 @@ Deb, K., Pratap, A., Agarwal, S., & Meyarivan, T. A. M. T. (2002).
 A fast and elitist multiobjective genetic algorithm: NSGA-II.
 IEEE transactions on evolutionary computation, 6(2), 182-197.
 """
-import itertools
+import bisect
+import heapq
 import random
+from collections.abc import Sequence
 from functools import cmp_to_key
-from typing import List, Any, Callable
+from typing import List, Any, Callable, Optional, Set, Tuple
 import numpy as np
 
 
@@ -19,8 +21,6 @@ class NSGAMeta:
         self.values = tuple((m(obj) for m in metrics))
         self.rank = 0
         self.distance = 0.0
-        self.dominating: List["NSGAMeta"] = []
-        self.domination_counter = 0
 
     def dominates(self, other: "NSGAMeta") -> bool:
         return all(
@@ -117,44 +117,120 @@ def nsga2(
 
 
 def fast_non_dominated_sort(P: List[NSGAMeta]) -> List[List[NSGAMeta]]:
-    """Sorts P into Pareto fronts."""
-    fronts: List[List[NSGAMeta]] = [[]]
-    for p, q in itertools.combinations(P, 2):
-        if p.dominates(q):
-            p.dominating.append(q)
-            q.domination_counter += 1
-        elif q.dominates(p):
-            q.dominating.append(p)
-            p.domination_counter += 1
-
-    for p in P:
-        if p.domination_counter == 0:
-            p.rank = 1
-            fronts[0].append(p)
+    """Sorts P into Pareto fronts and assigns each element its rank.
 
-    i = 0
-    while fronts[i] != []:
-        fronts.append([])
-        for p in fronts[i]:
-            for q in p.dominating:
-                q.domination_counter -= 1
-                if q.domination_counter == 0:
-                    q.rank = i + 1
-                    fronts[i + 1].append(q)
-        i += 1
-    return fronts
+    The last front is always empty.
+    """
+    if len(P) == 0:
+        return [[]]
+    values = np.array([p.values for p in P], dtype=float)
+    front_indices = _front_indices(values)
+
+    fronts: List[List[NSGAMeta]] = []
+    previous = np.array([], dtype=int)
+    for front in range(front_indices.max() + 1):
+        current = np.flatnonzero(front_indices == front)
+        if front > 0:
+            # Order the front as if elements were added when the last element of the
+            # previous front which dominates them was processed, as in Deb et al.
+            dominates = _dominates(values[previous], values[current])
+            last_dominator = np.where(
+                dominates, np.arange(len(previous))[:, np.newaxis], -1
+            ).max(axis=0)
+            current = current[np.argsort(last_dominator, kind="stable")]
+        for i in current:
+            # Elements of the first two fronts share rank 1.
+            P[i].rank = max(front, 1)
+        fronts.append([P[i] for i in current])
+        previous = current
+    return fronts + [[]]
+
+
+def _dominates(values: np.ndarray, other_values: np.ndarray) -> np.ndarray:
+    """Matrix which indicates if row i of `values` dominates row j of `other_values`.
+
+    A row dominates another if it is strictly greater in every column.
+    """
+    return (values[:, np.newaxis, :] > other_values[np.newaxis, :, :]).all(axis=2)
+
+
+def _front_indices(values: np.ndarray) -> np.ndarray:
+    """Index of the Pareto front of each row of `values`, maximizing each column."""
+    if values.shape[1] == 2 and not np.isnan(values).any():
+        return _two_objective_front_indices(values)
+    return _dominance_matrix_front_indices(values)
+
+
+def _dominance_matrix_front_indices(values: np.ndarray) -> np.ndarray:
+    """Peel off fronts using the matrix which indicates which row dominates which."""
+    dominates = _dominates(values, values)
+    domination_counter = dominates.sum(axis=0)
+    front_indices = np.full(len(values), -1)
+    current = np.flatnonzero(domination_counter == 0)
+    front = 0
+    while len(current) > 0:
+        front_indices[current] = front
+        domination_counter -= dominates[current].sum(axis=0)
+        domination_counter[current] = -1  # Exclude them from the next front.
+        current = np.flatnonzero(domination_counter == 0)
+        front += 1
+    return front_indices
+
+
+def _two_objective_front_indices(values: np.ndarray) -> np.ndarray:
+    """Assign fronts in O(N log N) by sweeping over the first objective.
+
+    Rows are visited in order of decreasing first objective. Each row is placed in
+    the first front which has no row with a higher second objective (among those
+    with a strictly higher first objective), as such a row would dominate it.
+    The highest second objective per front decreases with the front index,
+    so this front can be found with a binary search.
+    """
+    order = np.lexsort((-values[:, 1], -values[:, 0]))
+    front_indices = np.empty(len(values), dtype=int)
+    # Negated highest second objective of each front, so that it is increasing.
+    front_max: List[float] = []
+
+    start = 0
+    while start < len(order):
+        # Rows with equal first objective can not dominate each other,
+        # so they are all placed before updating the fronts.
+        end = start
+        while end < len(order) and values[order[end], 0] == values[order[start], 0]:
+            end += 1
+        group = order[start:end]
+        fronts = [bisect.bisect_left(front_max, -values[row, 1]) for row in group]
+        front_indices[group] = fronts
+        for row, front in zip(group, fronts):
+            if front == len(front_max):
+                front_max.append(-values[row, 1])
+            else:
+                front_max[front] = min(front_max[front], -values[row, 1])
+        start = end
+    return front_indices
 
 
 def crowding_distance_assignment(
     I: List[NSGAMeta],  # noqa: E741 'I' is name in paper
 ) -> None:
-    for m in range(len(I[0].values)):
-        I = sorted(I, key=lambda x: x.values[m])  # noqa: E741
-        I[0].distance = I[-1].distance = float("inf")
+    distances = _crowding_distances(np.array([i.values for i in I], dtype=float))
+    for i, distance in zip(I, distances):
+        i.distance += distance
+
+
+def _crowding_distances(values: np.ndarray) -> np.ndarray:
+    """Crowding distance of each row of `values`, with boundary rows at infinity."""
+    distances = np.zeros(len(values))
+    order = np.arange(len(values))
+    for m in range(values.shape[1]):
+        # Ties keep their order from sorting on the previous objective.
+        order = order[np.argsort(values[order, m], kind="stable")]
+        sorted_values = values[order, m]
+        distances[order[0]] = distances[order[-1]] = float("inf")
         if (
-            I[-1].values[m] == I[0].values[m]
-            or np.isinf(I[0].values[m])
-            or np.isinf(I[-1].values[m])
+            sorted_values[-1] == sorted_values[0]
+            or np.isinf(sorted_values[0])
+            or np.isinf(sorted_values[-1])
         ):
             # Would raise divisionbyzero later, or give other numerical warnings.
             # This typically happens only for the worst pareto front(s),
@@ -162,7 +238,225 @@ def crowding_distance_assignment(
             # Might consider immediately removing failing individuals.
             continue
 
-        for i_prev, i, i_next in zip(I, I[1:], I[2:]):
-            i.distance += (i_next.values[m] - i_prev.values[m]) / (
-                I[-1].values[m] - I[0].values[m]
+        distances[order[1:-1]] += (sorted_values[2:] - sorted_values[:-2]) / (
+            sorted_values[-1] - sorted_values[0]
+        )
+    return distances
+
+
+class NSGAPopulation(Sequence):
+    """A population which keeps the NSGA-II rank and crowding distance up to date.
+
+    Instead of sorting the entire population into Pareto fronts for each selection,
+    adding or removing an element only updates the fronts of elements it dominates.
+    Crowding distances are only recomputed for fronts which changed.
+    Elements which are at least as good in every value as another element are also
+    tracked, so the worst Pareto front is known without comparing all elements.
+
+    Parameters
+    ----------
+    items: List, optional (default=None)
+        List of elements in the population. The list is updated in place as
+        elements are added or removed, so it always reflects the population.
+    get_values_fn: Callable, optional (default=None)
+        Function that takes an element and returns a tuple of values,
+        such that each should be maximized.
+        If left None, it is assumed that elements are already such tuples.
+    """
+
+    def __init__(
+        self,
+        items: Optional[List[Any]] = None,
+        get_values_fn: Optional[Callable[[Any], Tuple[float, ...]]] = None,
+    ):
+        self._get_values_fn = get_values_fn
+        self._items: List[Any] = [] if items is None else items
+        self._slots: List[int] = []  # Slot of each element of self._items.
+        self._free_slots: List[int] = []
+        self._n_inserted = 0
+
+        # Per slot, the values of the element and the information about it:
+        self._values = np.empty((0, 0))
+        self._order = np.empty(0, dtype=int)  # Increases with insertion time.
+        self._fronts = np.empty(0, dtype=int)
+        self._distances = np.empty(0)
+        # Number of elements which are worse than or equal to this element.
+        self._n_weakly_dominated = np.empty(0, dtype=int)
+        # [i, j] is True if the element in slot i dominates that in slot j.
+        self._dominates = np.empty((0, 0), dtype=bool)
+        self._changed_fronts: Set[int] = set()
+
+        items, self._items[:] = list(self._items), []
+        for item in items:
+            self.append(item)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, item):
+        return self._items[item]
+
+    def _get_item_value(self, item) -> np.ndarray:
+        values = self._get_values_fn(item) if self._get_values_fn else item
+        return np.asarray(values, dtype=float)
+
+    def _grow(self, n_values: int) -> None:
+        """Double the number of slots, all new slots are free."""
+        old, new = len(self._order), max(2 * len(self._order), 8)
+        values = np.zeros((new, n_values))
+        values[:old] = self._values.reshape(old, n_values)
+        dominates = np.zeros((new, new), dtype=bool)
+        dominates[:old, :old] = self._dominates
+        self._values, self._dominates = values, dominates
+        self._order = np.resize(self._order, new)
+        self._fronts = np.resize(self._fronts, new)
+        self._distances = np.resize(self._distances, new)
+        self._n_weakly_dominated = np.resize(self._n_weakly_dominated, new)
+        self._free_slots.extend(reversed(range(old, new)))
+
+    def clear(self) -> None:
+        """Remove all elements from the population."""
+        self._items[:] = []
+        self._slots = []
+        self._free_slots = list(reversed(range(len(self._order))))
+        self._dominates[:] = False
+        self._changed_fronts = set()
+
+    def append(self, item: Any) -> None:
+        """Add `item` to the population."""
+        values = self._get_item_value(item)
+        if not self._free_slots:
+            self._grow(len(values))
+        slot = self._free_slots.pop()
+        others = np.array(self._slots, dtype=int)
+
+        self._values[slot] = values
+        self._order[slot] = self._n_inserted
+        self._n_inserted += 1
+
+        other_values = self._values[others]
+        self._dominates[slot, others] = (values > other_values).all(axis=1)
+        self._dominates[others, slot] = (other_values > values).all(axis=1)
+        # Of equal elements, only the oldest is considered to be the worst.
+        at_least = (values >= other_values).all(axis=1)
+        at_most = (values <= other_values).all(axis=1)
+        self._n_weakly_dominated[slot] = at_least.sum()
+        self._n_weakly_dominated[others] += at_most & ~at_least
+
+        self._items.append(item)
+        self._slots.append(slot)
+        dominators = others[self._dominates[others, slot]]
+        self._fronts[slot] = (
+            self._fronts[dominators].max() + 1 if len(dominators) else 0
+        )
+        self._changed_fronts.add(self._fronts[slot])
+        self._push_down(slot)
+
+    def remove(self, item: Any) -> None:
+        """Remove `item` from the population."""
+        index = self._items.index(item)
+        self._items.pop(index)
+        slot = self._slots.pop(index)
+        others = np.array(self._slots, dtype=int)
+
+        values, other_values = self._values[slot], self._values[others]
+        at_least = (other_values >= values).all(axis=1)
+        equal = (other_values == values).all(axis=1)
+        older = self._order[others] < self._order[slot]
+        self._n_weakly_dominated[others] -= at_least & ~(equal & older)
+
+        dominated = np.flatnonzero(self._dominates[slot])
+        self._dominates[slot, :] = self._dominates[:, slot] = False
+        self._changed_fronts.add(self._fronts[slot])
+        self._free_slots.append(slot)
+        self._pull_up(dominated)
+
+    def _set_front(self, slot: int, front: int) -> None:
+        self._changed_fronts.update([self._fronts[slot], front])
+        self._fronts[slot] = front
+
+    def _push_down(self, slot: int) -> None:
+        """Move elements dominated by `slot` to a later front where required."""
+        to_check = [slot]
+        while to_check:
+            dominator = to_check.pop()
+            for dominated in np.flatnonzero(self._dominates[dominator]):
+                if self._fronts[dominated] <= self._fronts[dominator]:
+                    self._set_front(dominated, self._fronts[dominator] + 1)
+                    to_check.append(dominated)
+
+    def _pull_up(self, slots: np.ndarray) -> None:
+        """Move `slots` (and elements they dominate) to an earlier front if possible.
+
+        Elements are processed in order of their front, so the fronts of all
+        elements which dominate an element are final when it is processed.
+        """
+        to_check = [(self._fronts[slot], slot) for slot in slots]
+        heapq.heapify(to_check)
+        checked = set()
+        while to_check:
+            _, slot = heapq.heappop(to_check)
+            if slot in checked:
+                continue
+            checked.add(slot)
+            dominators = np.flatnonzero(self._dominates[:, slot])
+            front = self._fronts[dominators].max() + 1 if len(dominators) else 0
+            if front != self._fronts[slot]:
+                self._set_front(slot, front)
+                for dominated in np.flatnonzero(self._dominates[slot]):
+                    heapq.heappush(to_check, (self._fronts[dominated], dominated))
+
+    def _update_distances(self) -> None:
+        """Compute the crowding distances for all fronts which changed."""
+        slots = np.array(self._slots, dtype=int)
+        for front in self._changed_fronts:
+            members = slots[self._fronts[slots] == front]
+            if len(members) > 0:
+                self._distances[members] = _crowding_distances(self._values[members])
+        self._changed_fronts = set()
+
+    @property
+    def ranks(self) -> np.ndarray:
+        """Rank of each element, as assigned by `fast_non_dominated_sort`."""
+        return np.maximum(self._fronts[self._slots], 1)
+
+    @property
+    def distances(self) -> np.ndarray:
+        """Crowding distance of each element within its Pareto front."""
+        self._update_distances()
+        return self._distances[self._slots]
+
+    def select_pairs(self, n: int) -> List[Tuple[Any, Any]]:
+        """Select n pairs from the population, like `nsga2_select`."""
+        if len(self) < 3:
+            raise ValueError(
+                "population must be at least size 3 for a pair to be selected"
+            )
+        self._update_distances()
+
+        def select_one(exclude=None):
+            selected = random.sample(range(len(self)), k=3)
+            i, j = [s for s in selected if s != exclude][:2]
+            slot_i, slot_j = self._slots[i], self._slots[j]
+            rank_i, rank_j = max(self._fronts[slot_i], 1), max(self._fronts[slot_j], 1)
+            i_better = rank_i < rank_j or (
+                rank_i == rank_j and self._distances[slot_i] > self._distances[slot_j]
             )
+            return i if i_better else j
+
+        selected = []
+        for _ in range(n):
+            first = select_one()
+            second = select_one(exclude=first)
+            selected.append((self._items[first], self._items[second]))
+        return selected
+
+    def worst_front(self) -> List[Any]:
+        """Elements for which no other element is worse or equal in every value.
+
+        Of equal elements, only the oldest is included.
+        Matches the Pareto front of the population with all values negated.
+        """
+        slots = np.array(self._slots, dtype=int)
+        worst = self._n_weakly_dominated[slots] == 0
+        return [item for item, is_worst in zip(self._items, worst) if is_worst]
@@ -1,5 +1,6 @@
 import logging
-from typing import Callable, Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Set, Tuple, Any, Union
+import uuid
 from gama.genetic_programming.components.primitive_node import PrimitiveNode
 
 from sklearn.pipeline import Pipeline
@@ -11,6 +12,15 @@ from .components import Individual
 log = logging.getLogger(__name__)
 
 
+def _halve(subsample: Optional[Union[int, float]]) -> Union[int, float]:
+    """Half the `subsample` size, where None means all data."""
+    if subsample is None:
+        return 0.5
+    if isinstance(subsample, float):
+        return subsample / 2
+    return max(1, subsample // 2)
+
+
 class OperatorSet:
     """Provides a thin layer for ea operators for logging, callbacks and safety."""
 
@@ -24,7 +34,9 @@ class OperatorSet:
         eliminate: Callable[[List[Individual], int], List[Individual]],
         evaluate_callback: Callable[[Evaluation], None],
         max_retry: int = 50,
-        completed_evaluations: Optional[Dict[str, Evaluation]] = None,
+        completed_evaluations: Optional[Dict[Tuple[str, ...], Evaluation]] = None,
+        retry_memory_errors: bool = False,
+        max_eval_time: Optional[float] = None,
     ):
         self._mutate = mutate
         self._mate = mate
@@ -37,23 +49,79 @@ class OperatorSet:
         self._evaluate = None
         self._evaluate_callback = evaluate_callback
         self.evaluate: Optional[Callable[..., Evaluation]] = None
+        # Creates the evaluation of an individual whose evaluation did not return,
+        # e.g. because its worker was terminated for its memory usage.
+        self.failed_evaluation: Optional[
+            Callable[[Individual, Exception], Evaluation]
+        ] = None
 
         self._completed_evaluations = completed_evaluations
-
-    def wait_next(self, async_evaluator):
-        """Wrapper for wait_next() to forward evaluation and log exceptions."""
+        # If set, evaluations terminated for their memory usage are retried once
+        # with half the training data.
+        self.retry_memory_errors = retry_memory_errors
+        self._retried_futures: Set[uuid.UUID] = set()
+        # Maximum time in seconds for an evaluation, search methods may use less.
+        self.max_eval_time = max_eval_time
+
+    def wait_next(self, async_evaluator, retry_memory_errors: bool = True):
+        """Wrapper for wait_next() to forward evaluation and log exceptions.
+
+        Set `retry_memory_errors` to False if the search depends on the amount of
+        data it evaluates individuals on, e.g. the rungs of successive halving.
+        """
         future = async_evaluator.wait_next()
+        while isinstance(future.exception, MemoryError):
+            # The worker was terminated, so it did not return an evaluation.
+            self._log_failure(future)
+            if not self._should_retry(future, retry_memory_errors):
+                break
+            log.info(f"Retrying {future.args[0]._id} with less data: out of memory.")
+            retry = async_evaluator.submit(
+                future.fn,
+                *future.args,
+                time_limit=future.time_limit,
+                priority=future.priority,
+                **{
+                    **future.kwargs,
+                    "subsample": _halve(future.kwargs.get("subsample")),
+                },
+            )
+            self._retried_futures.add(retry.id)
+            future = async_evaluator.wait_next()
+        if isinstance(future.exception, TimeoutError):
+            # Terminated for exceeding its time limit, which a retry would exceed too.
+            self._log_failure(future)
+
         if future.result and self._evaluate_callback:
             self._evaluate_callback(future.result)
         elif future.exception:
             log.warning(f"Error raised during evaluation: {str(future.exception)}.")
         return future
 
+    def _log_failure(self, future) -> None:
+        """Report the evaluation of an individual whose worker was terminated.
+
+        The evaluation is then also known as completed, so it is not created again.
+        """
+        if self.failed_evaluation is None or self._evaluate_callback is None:
+            return
+        if len(future.args) > 0 and isinstance(future.args[0], Individual):
+            evaluation = self.failed_evaluation(future.args[0], future.exception)
+            self._evaluate_callback(evaluation)
+
+    def _should_retry(self, future, retry_memory_errors: bool = True) -> bool:
+        if not (self.retry_memory_errors and retry_memory_errors):
+            return False
+        if future.id in self._retried_futures:
+            self._retried_futures.remove(future.id)
+            return False
+        return len(future.args) > 0 and isinstance(future.args[0], Individual)
+
     def try_until_new(self, operator, *args, **kwargs):
         """Keep executing `operator` until a new individual is created."""
         for _ in range(self._max_retry):
             individual = operator(*args, **kwargs)
-            if str(individual.main_node) not in self._completed_evaluations:
+            if individual.structure_key not in self._completed_evaluations:
                 return individual
         log.debug(f"50 iterations of {operator.__name__} did not yield new ind.")
         # For progress on solving this, see #11
@@ -56,6 +56,8 @@ class EvaluationLogger:
                 score=partial(_nested_getattr, attr="individual.fitness.values"),
                 pipeline=lambda e: e.individual.pipeline_str(),
                 error=operator.attrgetter("error"),
+                cache_hits=operator.attrgetter("cache_hits"),
+                cache_misses=operator.attrgetter("cache_misses"),
             )
         else:
             self.fields = fields
@@ -5,13 +5,17 @@ import random
 import time
 from typing import Optional, List, TYPE_CHECKING, Dict, Tuple, Sequence
 
+import numpy as np
 import pandas as pd
+import scipy.sparse
+import stopit
 from sklearn.base import TransformerMixin
 from sklearn.preprocessing import OneHotEncoder
 
 from gama.genetic_programming.components import Individual
 from gama.postprocessing.base_post_processing import BasePostProcessing
 from gama.utilities.evaluation_library import EvaluationLibrary, Evaluation
+from gama.utilities.generic.async_evaluator import AsyncEvaluator
 from gama.utilities.export import (
     imports_and_steps_for_individual,
     format_import,
@@ -34,6 +38,7 @@ class EnsemblePostProcessing(BasePostProcessing):
         ensemble_size: Optional[int] = 25,
         hillclimb_size: Optional[int] = 10_000,
         max_models: Optional[int] = 200,
+        refit: bool = False,
     ):
         """Ensemble construction per Caruana et al.
 
@@ -51,6 +56,10 @@ class EnsemblePostProcessing(BasePostProcessing):
         max_models: int, optional (default=200)
             Only consider the best `max_models` number of models. If `None`, use all.
             Consequently also sets the max number of unique models in the ensemble.
+        refit: bool (default=False)
+            If True, fit the pipelines of the ensemble on all data in parallel.
+            Pipelines which are not fit before the time runs out are left out of the
+            ensemble. If False, use the estimators fit during cross-validation.
         """
         super().__init__(time_fraction)
         self._hyperparameters = dict(
@@ -59,6 +68,7 @@ class EnsemblePostProcessing(BasePostProcessing):
             evaluation_library=(None, None),
             hillclimb_size=(hillclimb_size, 10_000),
             max_models=(max_models, 200),
+            refit=(refit, False),
         )
         self._ensemble: Optional[Ensemble] = None
 
@@ -78,6 +88,7 @@ class EnsemblePostProcessing(BasePostProcessing):
             timeout,
             self.hyperparameters["metric"],
             self.hyperparameters["evaluation_library"],
+            refit=self.hyperparameters["refit"],
         )
         return self._ensemble
 
@@ -201,6 +212,7 @@ class Ensemble(object):
         self._fit_models = None
         self._maximize = True
         self._models: Dict[uuid.UUID, Tuple[Evaluation, int]] = {}
+        self._stacked_predictions: Optional[np.ndarray] = None
 
     @property
     def model_library(self):
@@ -208,6 +220,8 @@ class Ensemble(object):
             self._model_library = []
             for evaluation in self.evaluation_library.n_best(self._use_top_n_only):
                 predictions = evaluation.predictions
+                if predictions is None:
+                    continue  # E.g., the score was reused from an earlier run.
                 if self._prediction_transformation:
                     predictions = self._prediction_transformation(predictions)
                 if self._prediction_sample:
@@ -222,6 +236,64 @@ class Ensemble(object):
     def _ensemble_validation_score(self, prediction_to_validate=None):
         raise NotImplementedError("Must be implemented by child class.")
 
+    def _batch_validation_scores(self, candidates: np.ndarray) -> Optional[np.ndarray]:
+        """Score each candidate prediction (axis 0), None if the metric is unsupported.
+
+        Child classes implement this for common metrics,
+        other metrics are scored candidate by candidate.
+        """
+        return None
+
+    @property
+    def stacked_predictions(self) -> np.ndarray:
+        """Predictions of the model library as one (models, rows, outputs) array."""
+        if self._stacked_predictions is None:
+            predictions = []
+            for model in self.model_library:
+                prediction = model.predictions
+                if scipy.sparse.issparse(prediction):
+                    prediction = prediction.toarray()
+                prediction = np.asarray(prediction, dtype=np.float32)
+                predictions.append(prediction.reshape(len(prediction), -1))
+            self._stacked_predictions = np.stack(predictions)
+        return self._stacked_predictions
+
+    def _candidate_scores(
+        self, weighted_sum: np.ndarray, total_weight: int, max_chunk_mb: int = 256
+    ) -> Optional[np.ndarray]:
+        """Ensemble scores if each model in the library were added to the ensemble.
+
+        Parameters
+        ----------
+        weighted_sum: np.ndarray
+            Sum of the (rows, outputs) predictions of models in the ensemble,
+            each multiplied by its weight.
+        total_weight: int
+            Sum of weights of the models in the ensemble.
+        max_chunk_mb: int (default=256)
+            Candidates are scored in chunks of at most this many megabytes.
+
+        Returns
+        -------
+        np.ndarray, optional
+            The score for each model in the library, or None if the metric is not
+            supported by `_batch_validation_scores`.
+        """
+        library = self.stacked_predictions
+        # Predictions are stored as float32, candidates are computed in float64.
+        chunk_size = max(1, (max_chunk_mb * 2**20) // (8 * weighted_sum.size))
+        scores = []
+        for start in range(0, len(library), chunk_size):
+            chunk = library[start : start + chunk_size]
+            candidates = (weighted_sum[np.newaxis] + chunk) / (total_weight + 1)
+            chunk_scores = self._batch_validation_scores(candidates)
+            if chunk_scores is None:
+                return None
+            scores.append(chunk_scores)
+        all_scores = np.concatenate(scores)
+        excluded = [model.score == 0 for model in self.model_library]
+        return np.where(np.isnan(all_scores) | excluded, -np.inf, all_scores)
+
     def _total_fit_weights(self):
         return sum(weight for (model, weight) in self._fit_models)
 
@@ -278,21 +350,38 @@ class Ensemble(object):
         if n <= 0:
             raise ValueError("n must be greater than 0.")
 
+        library_index = {
+            model.individual._id: i for i, model in enumerate(self.model_library)
+        }
         for _ in range(n):
-            best_addition_score = -float("inf")
-            current_weighted_average = self._averaged_validation_predictions()
             current_total_weight = self._total_model_weights()
-            for model in self.model_library:
-                if model.score == 0:
-                    continue
-                candidate_pred = current_weighted_average + (
-                    model.predictions - current_weighted_average
-                ) / (current_total_weight + 1)
-                candidate_ensemble_score = self._ensemble_validation_score(
-                    candidate_pred
+            weighted_sum = np.zeros(self.stacked_predictions.shape[1:])
+            for model, weight in self._models.values():
+                weighted_sum += (
+                    weight
+                    * self.stacked_predictions[library_index[model.individual._id]]
                 )
-                if best_addition_score < candidate_ensemble_score:
-                    best_addition, best_addition_score = model, candidate_ensemble_score
+            scores = self._candidate_scores(weighted_sum, current_total_weight)
+
+            if scores is not None:
+                best = int(np.argmax(scores))
+                best_addition = self.model_library[best]
+                best_addition_score = scores[best]
+            else:
+                best_addition_score = -float("inf")
+                current_weighted_average = self._averaged_validation_predictions()
+                for model in self.model_library:
+                    if model.score == 0:
+                        continue
+                    candidate_pred = current_weighted_average + (
+                        model.predictions - current_weighted_average
+                    ) / (current_total_weight + 1)
+                    candidate_ensemble_score = self._ensemble_validation_score(
+                        candidate_pred
+                    )
+                    if best_addition_score < candidate_ensemble_score:
+                        best_addition = model
+                        best_addition_score = candidate_ensemble_score
 
             self._add_model(best_addition)
             self._internal_score = best_addition_score
@@ -301,7 +390,7 @@ class Ensemble(object):
                 f"best score: {best_addition_score}"
             )
 
-    def fit(self, x, y, timeout=1e6):
+    def fit(self, x, y, timeout=1e6, refit: bool = False):
         """Constructs an Ensemble out of the library of models.
 
         Parameters
@@ -314,7 +403,9 @@ class Ensemble(object):
             Maximum amount of time in seconds that is allowed for fitting pipelines.
             If this time is exceeded, only pipelines fit until that point are taken
             into account when making predictions.
-            Starting the parallelization takes roughly 4 seconds by itself.
+        refit: bool (default=False)
+            If True, fit the pipelines of the ensemble on `x` and `y` in parallel.
+            Otherwise, use the estimators which were fit during cross-validation.
         """
         if not self._models:
             raise RuntimeError(
@@ -323,29 +414,59 @@ class Ensemble(object):
         if timeout <= 0:
             raise ValueError("timeout must be greater than 0.")
 
+        if refit:
+            self._fit_models = self._refit_models(x, y, timeout)
+            if self._fit_models:
+                return
+            log.warning("No pipeline refit in time, using cross-validation models.")
+
         self._fit_models = [
             (estimator, weight)
             for (model, weight) in self._models.values()
             for estimator in model.estimators
         ]
-        # for (model, weight) in self._models.values():
-
-        # self._fit_models = []
-        # futures = set()
-        # with stopit.ThreadingTimeout(timeout) as c_mgr, AsyncEvaluator() as async_:
-        #     for (model, weight) in self._models.values():
-        #         futures.add(
-        #           async_.submit(fit_and_weight, (model.pipeline, X, y, weight))
-        #           )
-        #
-        #     for _ in self._models.values():
-        #         future = async_.wait_next()
-        #         pipeline, weight = future.result
-        #         if weight > 0:
-        #             self._fit_models.append((pipeline, weight))
-        #
-        # if not c_mgr:
-        #     log.info("Fitting of ensemble stopped early.")
+
+    def _refit_models(self, x, y, timeout: float) -> List[Tuple[object, int]]:
+        """Fit the pipelines of the ensemble on the workers until `timeout` passes.
+
+        Pipelines which fail or do not finish in time get weight 0,
+        i.e., they are not returned.
+        """
+        fit_models = []
+        defaults = AsyncEvaluator.defaults
+        # The data is sent to each worker once, instead of once per pipeline.
+        AsyncEvaluator.defaults = dict(x=x, y=y)
+        try:
+            # The time limit of search evaluations is meant for subsamples and folds,
+            # a refit on all data may take up to the full `timeout` instead.
+            with AsyncEvaluator(
+                wait_time_before_forced_shutdown=0, time_limit=timeout
+            ) as async_:
+                # The timeout ends before the evaluator shuts down, so shutting down
+                # is not interrupted and no workers are left running.
+                with stopit.ThreadingTimeout(timeout) as c_mgr:
+                    for model, weight in self._models.values():
+                        async_.submit(_fit_member, model.individual.pipeline, weight)
+
+                    while async_.futures:
+                        future = async_.wait_next()
+                        if future.exception is not None:
+                            log.warning(
+                                f"Exception refitting pipeline: {future.exception}"
+                            )
+                            continue
+                        pipeline, weight = future.result
+                        if weight > 0:
+                            fit_models.append((pipeline, weight))
+        finally:
+            AsyncEvaluator.defaults = defaults
+
+        if not c_mgr:
+            log.info(
+                f"Refitting ensemble stopped early, {len(fit_models)} out of "
+                f"{len(self._models)} pipelines finished in time."
+            )
+        return fit_models
 
     def _get_weighted_mean_predictions(self, X, predict_method="predict"):
         weighted_predictions = []
@@ -375,6 +496,7 @@ class Ensemble(object):
             )
             self._models = None
             self._model_library = None
+            self._stacked_predictions = None
             # self._y_true can not be removed as it is needed to ensure proper
             # dimensionality of predictions.
             # Alternatively, one could just save the number of classes instead.
@@ -408,6 +530,11 @@ def fit_and_weight(args):
     return pipeline, weight
 
 
+def _fit_member(pipeline, weight, x, y):
+    """Call `fit_and_weight` with the data which `AsyncEvaluator` passes by keyword."""
+    return fit_and_weight((pipeline, x, y, weight))
+
+
 class EnsembleClassifier(Ensemble):
     def __init__(self, metric, y_true, label_encoder=None, *args, **kwargs):
         super().__init__(metric, y_true, *args, **kwargs)
@@ -432,6 +559,22 @@ class EnsembleClassifier(Ensemble):
 
             self._prediction_transformation = one_hot_encode_predictions
 
+    def _batch_validation_scores(self, candidates: np.ndarray) -> Optional[np.ndarray]:
+        sign = self._metric.scorer._sign
+        if self._metric.name == "neg_log_loss":
+            # Mirrors sklearn.metrics.log_loss for one-hot encoded `y`.
+            eps = np.finfo(candidates.dtype).eps
+            probabilities = np.clip(candidates, eps, 1 - eps)
+            probabilities /= probabilities.sum(axis=2, keepdims=True)
+            losses = -(self._y * np.log(probabilities)).sum(axis=2).mean(axis=1)
+            return sign * losses
+        if self._metric.name == "accuracy":
+            # Mirrors OneHotEncoder.inverse_transform, which takes the argmax.
+            categories = self._one_hot_encoder.categories_[0]
+            y_index = np.searchsorted(categories, np.asarray(self._y).ravel())
+            return sign * (candidates.argmax(axis=2) == y_index).mean(axis=1)
+        return None
+
     def _ensemble_validation_score(self, prediction_to_validate=None):
         if prediction_to_validate is None:
             prediction_to_validate = self._averaged_validation_predictions()
@@ -475,6 +618,13 @@ class EnsembleClassifier(Ensemble):
 
 
 class EnsembleRegressor(Ensemble):
+    def _batch_validation_scores(self, candidates: np.ndarray) -> Optional[np.ndarray]:
+        if self._metric.name == "neg_mean_squared_error":
+            y = np.asarray(self._y, dtype=float).reshape(1, -1)
+            errors = ((candidates[:, :, 0] - y) ** 2).mean(axis=1)
+            return self._metric.scorer._sign * errors
+        return None
+
     def _ensemble_validation_score(self, prediction_to_validate=None):
         if prediction_to_validate is None:
             prediction_to_validate = self._averaged_validation_predictions()
@@ -492,6 +642,7 @@ def build_fit_ensemble(
     metric: Metric,
     evaluation_library: EvaluationLibrary,
     encoder: Optional[object] = None,
+    refit: bool = False,
 ) -> Ensemble:
     """Construct an Ensemble of models, optimizing for metric."""
     start_build = time.time()
@@ -521,7 +672,7 @@ def build_fit_ensemble(
         build_time = time.time() - start_build
         timeout -= build_time
         log.info(f"Ensemble build took {build_time}s. Fit with timeout {timeout}s.")
-        ensemble.fit(x, y, timeout)
+        ensemble.fit(x, y, timeout, refit=refit)
     except Exception as e:
         log.warning(f"Error during auto ensemble: {e}", exc_info=True)
 
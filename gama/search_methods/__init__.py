@@ -12,8 +12,14 @@ This submodule contains the different search methods available in GAMA.
 
 from gama.search_methods.asha import AsynchronousSuccessiveHalving
 from gama.search_methods.async_ea import AsyncEA
+from gama.search_methods.hyperband import AsynchronousHyperband
 from gama.search_methods.random_search import RandomSearch
 from gama.search_methods.base_search import _check_base_search_hyperparameters
 
 
-__all__ = ["AsynchronousSuccessiveHalving", "AsyncEA", "RandomSearch"]
+__all__ = [
+    "AsynchronousHyperband",
+    "AsynchronousSuccessiveHalving",
+    "AsyncEA",
+    "RandomSearch",
+]
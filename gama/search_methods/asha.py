@@ -1,8 +1,12 @@
+import collections
 from functools import partial
+import heapq
+import itertools
 import logging
 import math
-from typing import List, Optional, Dict, Tuple, Any, Union
+from typing import Callable, List, Optional, Dict, Tuple, Any, Union
 
+import numpy as np
 import pandas as pd
 import stopit
 
@@ -11,9 +15,17 @@ from gama.logging.evaluation_logger import EvaluationLogger
 from gama.search_methods.base_search import BaseSearch
 from gama.utilities.generic.async_evaluator import AsyncEvaluator
 from gama.genetic_programming.components.individual import Individual
+from gama.utilities.evaluation_library import Evaluation
 
 log = logging.getLogger(__name__)
 
+# Number of recent evaluations per rung to derive the timeout of that rung from,
+# and the number required before doing so.
+DURATION_WINDOW = 100
+MIN_DURATIONS = 10
+# Error of successful evaluations below the top rung, so they are not used after search.
+NOT_FULL_EVALUATION = "Not a full evaluation."
+
 
 class AsynchronousSuccessiveHalving(BaseSearch):
     """Asynchronous Halving Algorithm by Li et al.
@@ -34,6 +46,19 @@ class AsynchronousSuccessiveHalving(BaseSearch):
         If float, it specifies the fraction of the dataset.
     minimum_early_stopping_rate: int (default=0)
         Number of lowest rungs to skip.
+    resource: str (default="rows")
+        What an evaluation on a lower rung uses less of: "rows", "folds" or "both".
+        With "folds", the resources are relative to the maximum resource, and
+        a rung evaluates that fraction of the cross-validation folds (rounded up)
+        on all rows. Folds evaluated on a rung are not evaluated again on the next.
+        With "both", fewer rows are used and fewer folds are evaluated. As each rung
+        uses more rows, folds are then evaluated again on the next rung.
+    warm_start_promotions: bool (default=False)
+        If True and fewer rows are used on lower rungs, the final step of a promoted
+        pipeline continues training from its fit on the lower rung where possible,
+        instead of being fit from scratch. Only estimators which start from their
+        previous coefficients (e.g. SGD, logistic regression) or, without
+        preprocessing, support `partial_fit` (e.g. naive Bayes) continue training.
     """
 
     def __init__(
@@ -42,6 +67,8 @@ class AsynchronousSuccessiveHalving(BaseSearch):
         minimum_resource: Optional[Tuple[int, float]] = None,
         maximum_resource: Optional[Tuple[int, float]] = None,
         minimum_early_stopping_rate: Optional[int] = None,
+        resource: Optional[str] = None,
+        warm_start_promotions: Optional[bool] = None,
     ):
         super().__init__()
         # maps hyperparameter -> (set value, default)
@@ -50,6 +77,8 @@ class AsynchronousSuccessiveHalving(BaseSearch):
             minimum_resource=(minimum_resource, 0.125),
             maximum_resource=(maximum_resource, 1.0),
             minimum_early_stopping_rate=(minimum_early_stopping_rate, 0),
+            resource=(resource, "rows"),
+            warm_start_promotions=(warm_start_promotions, False),
         )
         self.output = []
 
@@ -61,6 +90,15 @@ class AsynchronousSuccessiveHalving(BaseSearch):
             ),
         )
 
+    @property
+    def uses_fold_cache(self) -> bool:
+        hyperparameters = self.hyperparameters
+        return (
+            # With "both", each rung uses more rows, so it can not reuse folds.
+            hyperparameters["resource"] == "folds"
+            or hyperparameters["warm_start_promotions"]
+        )
+
     def dynamic_defaults(
         self, x: pd.DataFrame, y: pd.DataFrame, time_limit: float
     ) -> None:
@@ -77,7 +115,10 @@ class AsynchronousSuccessiveHalving(BaseSearch):
         self, operations: OperatorSet, start_candidates: List[Individual]
     ) -> None:
         self.output = asha(
-            operations, start_candidates=start_candidates, **self.hyperparameters
+            operations,
+            start_candidates=start_candidates,
+            max_eval_time=operations.max_eval_time,
+            **self.hyperparameters,
         )
 
 
@@ -88,7 +129,10 @@ def asha(
     minimum_resource: Union[int, float] = 0.125,
     maximum_resource: Union[int, float] = 1.0,
     minimum_early_stopping_rate: int = 0,
+    resource: str = "rows",
+    warm_start_promotions: bool = False,
     max_full_evaluations: Optional[int] = None,
+    max_eval_time: Optional[float] = None,
 ) -> List[Individual]:
     """Asynchronous Halving Algorithm by Li et al.
 
@@ -112,9 +156,17 @@ def asha(
         If float, it specifies the fraction of the dataset.
     minimum_early_stopping_rate: int (default=1)
         Number of lowest rungs to skip.
+    resource: str (default="rows")
+        "rows", "folds" or "both", see `AsynchronousSuccessiveHalving`.
+    warm_start_promotions: bool (default=False)
+        Continue training promoted pipelines, see `AsynchronousSuccessiveHalving`.
     max_full_evaluations: Optional[int] (default=None)
         Maximum number of individuals to evaluate on the max rung (i.e. on all data).
         If None, the algorithm will be run indefinitely.
+    max_eval_time: float, optional (default=None)
+        Maximum time in seconds for one evaluation. Evaluations on lower rungs get
+        less time, in proportion to their resource until enough evaluations on the rung
+        completed, and then based on how long those took. If None, 600 seconds.
 
     Returns
     -------
@@ -139,72 +191,185 @@ def asha(
     evaluate = partial(
         evaluate_on_rung, evaluate_individual=operations.evaluate, max_rung=max_rung
     )
+    bracket = _Bracket(
+        rung_resources,
+        reduction_factor,
+        max_eval_time=600 if max_eval_time is None else max_eval_time,
+        resource=resource,
+        warm_start=warm_start_promotions,
+    )
 
-    # Highest rungs first is how we typically iterate them
-    # Should we just use lists of lists/heaps instead?
-    rung_individuals: Dict[int, List[Tuple[float, Individual]]] = {
-        rung: [] for rung in reversed(rungs)
-    }
-    promoted_individuals: Dict[int, List[Individual]] = {
-        rung: [] for rung in reversed(rungs)
-    }
-
-    def get_job():
-        for rung, individuals in list(rung_individuals.items())[1:]:
-            # This is not in the paper code but is derived from fig 2b
-            n_to_promote = math.floor(len(individuals) / reduction_factor)
-            if n_to_promote - len(promoted_individuals[rung]) > 0:
-                # Problem: equal loss falls back on comparison of individual
-                not_promoted = set(individuals) - set(promoted_individuals[rung])
-                if len(not_promoted) > 0:
-                    to_promote = max(not_promoted, key=lambda i: i[0])
-                    promoted_individuals[rung].append(to_promote)
-                    return to_promote[1], rung + 1
-
+    def new_individual() -> Individual:
         if start_candidates:
-            return start_candidates.pop(), minimum_early_stopping_rate
-        return operations.individual(), minimum_early_stopping_rate
+            return start_candidates.pop()
+        return operations.individual()
 
     try:
         with AsyncEvaluator() as async_:
             log.info("ASHA start")
 
             def start_new_job():
-                individual, rung = get_job()
-                time_penalty = rung_resources[rung] / max(rung_resources.values())
+                individual, rung = bracket.get_job(new_individual)
+                timeout = bracket.timeout(rung)
                 async_.submit(
                     evaluate,
                     individual,
                     rung,
-                    subsample=rung_resources[rung],
-                    timeout=(10 + (time_penalty * 600)),
+                    **bracket.rung_kwargs(rung),
+                    timeout=timeout,
+                    time_limit=1.2 * timeout + 5,
+                    # Evaluate promotions first, so higher rungs fill up sooner.
+                    priority=rung,
                 )
 
-            for _ in range(8):
-                start_new_job()
+            def fill_idle_workers():
+                # Create jobs only when a worker can start on them, so promotions
+                # are based on as many results as possible. Remote workers may
+                # connect later, so there is always at least one job.
+                while async_.job_queue_size < 0 or len(async_.futures) == 0:
+                    start_new_job()
+
+            fill_idle_workers()
 
             while (max_full_evaluations is None) or (
-                len(rung_individuals[max_rung]) < max_full_evaluations
+                len(bracket.rung_individuals[max_rung]) < max_full_evaluations
             ):
-                future = operations.wait_next(async_)
+                # Retrying on less data would rank the result on the wrong rung.
+                future = operations.wait_next(async_, retry_memory_errors=False)
                 if future.result is not None:
-                    rung = future.result.individual.meta["rung"]
-                    loss = future.result.score[0]
-                    individual = future.result.individual
-                    rung_individuals[rung].append((loss, individual))
-                start_new_job()
+                    bracket.add_result(future.result)
+                fill_idle_workers()
 
             highest_rung_reached = max(rungs)
     except stopit.TimeoutException:
         log.info("ASHA ended due to timeout.")
-        reached_rungs = (rung for rung, inds in rung_individuals.items() if inds != [])
-        highest_rung_reached = max(reached_rungs)
+        highest_rung_reached = bracket.highest_rung_reached
         if highest_rung_reached != max(rungs):
             raise RuntimeWarning("Highest rung not reached.")
     finally:
-        for rung, individuals in rung_individuals.items():
+        for rung, individuals in bracket.rung_individuals.items():
             log.info(f"[{len(individuals)}] {rung}")
-        return list(map(lambda p: p[1], rung_individuals[highest_rung_reached]))
+        return [ind for _, ind in bracket.rung_individuals[highest_rung_reached]]
+
+
+class _Bracket:
+    """Evaluated and promoted individuals of each rung of one ASHA bracket.
+
+    Parameters
+    ----------
+    rung_resources: Dict[int, Union[int, float]]
+        The resource (subsample) of each rung of the bracket, the highest rung
+        uses the maximum resource.
+    reduction_factor: int
+        Reduction factor of candidates between each rung.
+    max_eval_time: float
+        Maximum time in seconds for one evaluation, see `timeout`.
+    resource: str (default="rows")
+        "rows", "folds" or "both", see `AsynchronousSuccessiveHalving`.
+    warm_start: bool (default=False)
+        If True, evaluations on fewer rows are continued on higher rungs.
+    """
+
+    def __init__(
+        self,
+        rung_resources: Dict[int, Union[int, float]],
+        reduction_factor: int,
+        max_eval_time: float,
+        resource: str = "rows",
+        warm_start: bool = False,
+    ):
+        if resource not in ["rows", "folds", "both"]:
+            raise ValueError(
+                f"resource must be 'rows', 'folds' or 'both', is {resource}."
+            )
+        self._resource = resource
+        self._warm_start = warm_start and resource in ["rows", "both"]
+        self.rung_resources = rung_resources
+        self.max_rung = max(rung_resources)
+        self._reduction_factor = reduction_factor
+        self._max_eval_time = max_eval_time
+        # Highest rungs first is how we typically iterate them
+        self.rung_individuals: Dict[int, List[Tuple[float, Individual]]] = {
+            rung: [] for rung in sorted(rung_resources, reverse=True)
+        }
+        # For each rung, a max-heap of the individuals which are not promoted yet,
+        # as (-loss, order, individual). Equal losses are promoted in order of arrival.
+        self._promotable: Dict[int, List[Tuple[float, int, Individual]]] = {
+            rung: [] for rung in rung_resources
+        }
+        self._n_promoted: Dict[int, int] = {rung: 0 for rung in rung_resources}
+        self._arrival = itertools.count()
+        self._durations: Dict[int, collections.deque] = {
+            rung: collections.deque(maxlen=DURATION_WINDOW) for rung in rung_resources
+        }
+        # Loss of promoted individuals on the rung they were promoted from,
+        # and for each rung the (loss, loss on the next rung) of promoted individuals.
+        self._promoted_loss: Dict[str, float] = {}
+        self.rung_pairs: Dict[int, List[Tuple[float, float]]] = {
+            rung: [] for rung in rung_resources
+        }
+
+    @property
+    def highest_rung_reached(self) -> int:
+        return max(rung for rung, inds in self.rung_individuals.items() if inds != [])
+
+    def get_job(
+        self, new_individual: Callable[[], Individual]
+    ) -> Tuple[Individual, int]:
+        """Return an individual to promote and its new rung, or a new individual."""
+        for rung, individuals in list(self.rung_individuals.items())[1:]:
+            # This is not in the paper code but is derived from fig 2b
+            n_to_promote = math.floor(len(individuals) / self._reduction_factor)
+            if n_to_promote - self._n_promoted[rung] > 0:
+                loss, _, to_promote = heapq.heappop(self._promotable[rung])
+                self._n_promoted[rung] += 1
+                self._promoted_loss[to_promote._id] = -loss
+                return to_promote, rung + 1
+        return new_individual(), min(self.rung_resources)
+
+    def rung_kwargs(self, rung: int) -> Dict[str, Any]:
+        """Keyword arguments for `evaluate_pipeline` to evaluate on `rung`."""
+        kwargs: Dict[str, Any] = {}
+        if self._resource in ["rows", "both"]:
+            kwargs["subsample"] = self.rung_resources[rung]
+        if self._resource in ["folds", "both"] and rung != self.max_rung:
+            fraction = self.rung_resources[rung] / self.rung_resources[self.max_rung]
+            kwargs["n_folds"] = float(fraction)
+        if self._warm_start:
+            kwargs["warm_start"] = True
+        return kwargs
+
+    def timeout(self, rung: int) -> float:
+        """Time in seconds an evaluation on `rung` may take.
+
+        Proportional to the resource of the rung, or longer once enough evaluations
+        on the rung completed if those took longer, but at most `max_eval_time`.
+        """
+        time_penalty = self.rung_resources[rung] / self.rung_resources[self.max_rung]
+        timeout = 10 + time_penalty * self._max_eval_time
+        durations = self._durations[rung]
+        if len(durations) >= MIN_DURATIONS:
+            # Allow a wide margin, slow pipelines may still be the best ones.
+            timeout = max(timeout, 2 * np.quantile(durations, 0.9))
+        return min(timeout, self._max_eval_time)
+
+    def add_result(self, evaluation: Evaluation) -> None:
+        """Record the evaluation of an individual on its rung."""
+        individual = evaluation.individual
+        rung = individual.meta["rung"]
+        loss = evaluation.score[0]
+        self.rung_individuals[rung].append((loss, individual))
+        if evaluation.error in [None, NOT_FULL_EVALUATION] and not (
+            evaluation.reused or evaluation.race_aborted
+        ):
+            # Only durations of completed computations tell how long evaluations take.
+            self._durations[rung].append(evaluation.duration)
+        previous_loss = self._promoted_loss.pop(individual._id, None)
+        if previous_loss is not None:
+            self.rung_pairs[rung - 1].append((previous_loss, loss))
+        if rung < self.max_rung:
+            entry = (-loss, next(self._arrival), individual)
+            heapq.heappush(self._promotable[rung], entry)
 
 
 def evaluate_on_rung(individual, rung, max_rung, evaluate_individual, *args, **kwargs):
@@ -215,5 +380,5 @@ def evaluate_on_rung(individual, rung, max_rung, evaluate_individual, *args, **k
     # because we only want to use pipelines evaluated on the max rung after search.
     # We're working on a better way to relay this information, this is temporary.
     if evaluation.error is None and rung != max_rung:
-        evaluation.error = "Not a full evaluation."
+        evaluation.error = NOT_FULL_EVALUATION
     return evaluation
@@ -5,6 +5,7 @@ from typing import Optional, Any, Tuple, Dict, List, Callable
 import pandas as pd
 
 from gama.genetic_programming.components import Individual
+from gama.genetic_programming.nsga2 import NSGAPopulation
 from gama.genetic_programming.operator_set import OperatorSet
 from gama.logging.evaluation_logger import EvaluationLogger
 from gama.search_methods.base_search import BaseSearch
@@ -27,6 +28,12 @@ class AsyncEA(BaseSearch):
 
     restart_callback: Callable[[], bool], optional (default=None)
         Function which takes no arguments and returns True if search restart.
+
+    racing: bool (default=False)
+        If True, once the population is full, new individuals are evaluated with
+        the lowest score (of the first metric) in the population as race threshold.
+        Evaluation of an individual is stopped after any fold once it is unlikely
+        to exceed that threshold, see `evaluate_pipeline`.
     """
 
     def __init__(
@@ -34,6 +41,7 @@ class AsyncEA(BaseSearch):
         population_size: Optional[int] = None,
         max_n_evaluations: Optional[int] = None,
         restart_callback: Optional[Callable[[], bool]] = None,
+        racing: bool = False,
     ):
         super().__init__()
         # maps hyperparameter -> (set value, default)
@@ -41,6 +49,7 @@ class AsyncEA(BaseSearch):
             population_size=(population_size, 50),
             restart_callback=(restart_callback, None),
             max_n_evaluations=(max_n_evaluations, None),
+            racing=(racing, False),
         )
         self.output = []
 
@@ -79,6 +88,7 @@ def async_ea(
     restart_callback: Optional[Callable[[], bool]] = None,
     max_n_evaluations: Optional[int] = None,
     population_size: int = 50,
+    racing: bool = False,
 ) -> List[Individual]:
     """Perform asynchronous evolutionary optimization with given operators.
 
@@ -97,6 +107,9 @@ def async_ea(
         If None, the algorithm will be run indefinitely.
     population_size: int (default=50)
         Maximum number of individuals in the population at any time.
+    racing: bool (default=False)
+        If True, pass the lowest score of the first metric in the full population
+        to `ops.evaluate` as `race_threshold`.
 
     Returns
     -------
@@ -110,14 +123,15 @@ def async_ea(
 
     max_pop_size = population_size
 
-    current_population = output
+    # Keeps `output` up to date, while maintaining information for selection.
+    current_population = NSGAPopulation(output, lambda ind: ind.fitness.values)
     n_evaluated_individuals = 0
 
     with AsyncEvaluator() as async_:
         should_restart = True
         while should_restart:
             should_restart = False
-            current_population[:] = []
+            current_population.clear()
             log.info("Starting EA with new population.")
             for individual in start_candidates:
                 async_.submit(ops.evaluate, individual)
@@ -132,15 +146,20 @@ def async_ea(
                         to_remove = ops.eliminate(current_population, 1)
                         current_population.remove(to_remove[0])
 
-                if async_.job_queue_size <= 1:
-                    # Technically 0 should work to keep near-100% worker load,
-                    # especially if the dataset is sufficiently large to require
-                    # significant time to evaluate a pipeline.
-                    # Increasing the number decreases the risk of lost compute time,
-                    # but also increases information lag. An offspring created too
-                    # early might miss out on a better parent.
+                # Futures are only passed to idle workers, so an offspring is
+                # created just before a worker can evaluate it, from the most recent
+                # population. Without any futures left, `wait_next` can not return.
+                while async_.job_queue_size < 0 or len(async_.futures) == 0:
                     new_individual = ops.create(current_population, 1)[0]
-                    async_.submit(ops.evaluate, new_individual)
+                    if racing and len(current_population) >= max_pop_size:
+                        threshold = min(
+                            ind.fitness.values[0] for ind in current_population
+                        )
+                        async_.submit(
+                            ops.evaluate, new_individual, race_threshold=threshold
+                        )
+                    else:
+                        async_.submit(ops.evaluate, new_individual)
 
                 should_restart = restart_callback is not None and restart_callback()
                 n_evaluated_individuals += 1
@@ -149,4 +168,4 @@ def async_ea(
                     start_candidates = [ops.individual() for _ in range(max_pop_size)]
                     break
 
-    return current_population
+    return output
@@ -47,6 +47,12 @@ class BaseSearch(ABC):
             for parameter, (set_value, default) in self._hyperparameters.items()
         }
 
+    @property
+    def uses_fold_cache(self) -> bool:
+        """True if pipelines are evaluated again on more folds or rows, continuing
+        from their earlier evaluation, which requires a `FoldCache`."""
+        return False
+
     def _overwrite_hyperparameter_default(self, hyperparameter: str, value: Any):
         set_value, default_value = self._hyperparameters[hyperparameter]
         self._hyperparameters[hyperparameter] = (set_value, value)
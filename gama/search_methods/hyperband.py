@@ -0,0 +1,290 @@
+from functools import partial
+import logging
+import math
+from typing import List, Optional, Dict, Tuple, Any, Union
+
+import numpy as np
+import pandas as pd
+import scipy.stats
+import stopit
+
+from gama.genetic_programming.operator_set import OperatorSet
+from gama.logging.evaluation_logger import EvaluationLogger
+from gama.search_methods.asha import _Bracket, evaluate_on_rung
+from gama.search_methods.base_search import BaseSearch
+from gama.utilities.generic.async_evaluator import AsyncEvaluator
+from gama.genetic_programming.components.individual import Individual
+
+log = logging.getLogger(__name__)
+
+# Number of individuals evaluated on two consecutive rungs required before their
+# rank correlation is used, until then the lower rung is assumed to be reliable.
+MIN_PAIRS = 10
+# Minimum weight of a bracket, so each bracket keeps getting some workers.
+MIN_WEIGHT = 0.1
+
+
+class AsynchronousHyperband(BaseSearch):
+    """Asynchronous Hyperband, running ASHA brackets with each early-stopping rate.
+
+    paper: https://arxiv.org/abs/1810.05934
+
+    Each bracket is an asynchronous successive halving run which starts new
+    individuals on a different rung, the last bracket evaluates them on all data.
+    Brackets run concurrently, and an idle worker is given a job of the bracket
+    which has the fewest workers relative to its weight.
+    A bracket relies on the ranking of the rungs it promotes individuals from,
+    so its weight is the product of the Spearman rank correlations observed
+    between the scores on each of those rungs and the next one.
+
+    Parameters
+    ----------
+    reduction_factor: int, optional (default=3)
+        Reduction factor of candidates between each rung.
+    minimum_resource: int or float, optional (default=0.125)
+        Number of samples to use in the lowest rung.
+        If integer, it specifies the number of rows.
+        If float, it specifies the fraction of the dataset.
+    maximum_resource: int or float optional (default=1.0)
+        Number of samples to use in the top rung.
+        If integer, it specifies the number of rows.
+        If float, it specifies the fraction of the dataset.
+    resource: str (default="rows")
+        What an evaluation on a lower rung uses less of: "rows", "folds" or "both".
+        With "folds", the resources are relative to the maximum resource, and
+        a rung evaluates that fraction of the cross-validation folds (rounded up)
+        on all rows. Folds evaluated on a rung are not evaluated again on the next.
+        With "both", fewer rows are used and fewer folds are evaluated. As each rung
+        uses more rows, folds are then evaluated again on the next rung.
+    warm_start_promotions: bool (default=False)
+        Continue training promoted pipelines, see `AsynchronousSuccessiveHalving`.
+    """
+
+    def __init__(
+        self,
+        reduction_factor: Optional[int] = None,
+        minimum_resource: Optional[Tuple[int, float]] = None,
+        maximum_resource: Optional[Tuple[int, float]] = None,
+        resource: Optional[str] = None,
+        warm_start_promotions: Optional[bool] = None,
+    ):
+        super().__init__()
+        # maps hyperparameter -> (set value, default)
+        self._hyperparameters: Dict[str, Tuple[Any, Any]] = dict(
+            reduction_factor=(reduction_factor, 3),
+            minimum_resource=(minimum_resource, 0.125),
+            maximum_resource=(maximum_resource, 1.0),
+            resource=(resource, "rows"),
+            warm_start_promotions=(warm_start_promotions, False),
+        )
+        self.output = []
+
+        self.logger = partial(
+            EvaluationLogger,
+            extra_fields=dict(
+                bracket=lambda e: e.individual.meta.get("bracket", "unknown"),
+                rung=lambda e: e.individual.meta.get("rung", "unknown"),
+                subsample=lambda e: e.individual.meta.get("subsample", "unknown"),
+            ),
+        )
+
+    @property
+    def uses_fold_cache(self) -> bool:
+        hyperparameters = self.hyperparameters
+        return (
+            # With "both", each rung uses more rows, so it can not reuse folds.
+            hyperparameters["resource"] == "folds"
+            or hyperparameters["warm_start_promotions"]
+        )
+
+    def dynamic_defaults(
+        self, x: pd.DataFrame, y: pd.DataFrame, time_limit: float
+    ) -> None:
+        set_max, default = self._hyperparameters["maximum_resource"]
+        if set_max is not None and len(y) < set_max:
+            logging.warning(
+                f"`maximum_resource` was set to {set_max}, but the dataset only"
+                f"contains {len(y)} samples. Reverting to default (1.0) instead."
+            )
+            self._hyperparameters["maximum_resource"] = (None, default)
+
+    def search(
+        self, operations: OperatorSet, start_candidates: List[Individual]
+    ) -> None:
+        self.output = async_hyperband(
+            operations,
+            start_candidates=start_candidates,
+            max_eval_time=operations.max_eval_time,
+            **self.hyperparameters,
+        )
+
+
+def rank_correlation(pairs: List[Tuple[float, float]]) -> float:
+    """Spearman rank correlation of the pairs, 1 if there are too few to tell.
+
+    Negative correlations are reported as 0.
+    """
+    if len(pairs) < MIN_PAIRS:
+        return 1.0
+    lower, upper = zip(*pairs)
+    correlation = scipy.stats.spearmanr(lower, upper).correlation
+    if not np.isfinite(correlation):
+        return 1.0  # e.g. all scores on a rung are equal.
+    return max(0.0, correlation)
+
+
+def bracket_weights(brackets: List[_Bracket], max_rung: int) -> List[float]:
+    """Weight of each bracket `s`, which starts individuals on rung `s`.
+
+    The weight is the product of the rank correlations between each rung the bracket
+    promotes from and the next, pooled over all brackets, but at least `MIN_WEIGHT`.
+    """
+    correlations = [
+        rank_correlation([p for b in brackets for p in b.rung_pairs.get(rung, [])])
+        for rung in range(max_rung)
+    ]
+    return [
+        max(MIN_WEIGHT, float(np.prod(correlations[s:]))) for s in range(len(brackets))
+    ]
+
+
+def async_hyperband(
+    operations: OperatorSet,
+    start_candidates: List[Individual],
+    reduction_factor: int = 3,
+    minimum_resource: Union[int, float] = 0.125,
+    maximum_resource: Union[int, float] = 1.0,
+    resource: str = "rows",
+    warm_start_promotions: bool = False,
+    max_full_evaluations: Optional[int] = None,
+    max_eval_time: Optional[float] = None,
+) -> List[Individual]:
+    """Asynchronous Hyperband, see `AsynchronousHyperband`.
+
+    Parameters
+    ----------
+    operations: OperatorSet
+        An operator set with `evaluate` and `individual` functions.
+    start_candidates: List[Individual]
+        A list which contains the set of best found individuals during search.
+    reduction_factor: int (default=3)
+        Reduction factor of candidates between each rung.
+    minimum_resource: int or float, optional (default=0.125)
+        Number of samples to use in the lowest rung.
+        If integer, it specifies the number of rows.
+        If float, it specifies the fraction of the dataset.
+    maximum_resource: int or float optional (default=1.0)
+        Number of samples to use in the top rung.
+        If integer, it specifies the number of rows.
+        If float, it specifies the fraction of the dataset.
+    resource: str (default="rows")
+        "rows", "folds" or "both", see `AsynchronousSuccessiveHalving`.
+    warm_start_promotions: bool (default=False)
+        Continue training promoted pipelines, see `AsynchronousSuccessiveHalving`.
+    max_full_evaluations: Optional[int] (default=None)
+        Maximum number of individuals to evaluate on the max rung (i.e. on all data),
+        over all brackets. If None, the algorithm will be run indefinitely.
+    max_eval_time: float, optional (default=None)
+        Maximum time in seconds for one evaluation, see `asha`.
+        If None, 600 seconds.
+
+    Returns
+    -------
+    List[Individual]
+        Individuals of the highest rung in which at least one individual has been
+        evaluated, from all brackets.
+    """
+    if not isinstance(minimum_resource, type(maximum_resource)):
+        raise ValueError("Currently minimum and maximum resource must same type.")
+
+    max_rung = math.ceil(
+        math.log(maximum_resource / minimum_resource, reduction_factor)
+    )
+    rung_resources = {
+        rung: min(minimum_resource * (reduction_factor**rung), maximum_resource)
+        for rung in range(max_rung + 1)
+    }
+    evaluate = partial(
+        evaluate_on_rung, evaluate_individual=operations.evaluate, max_rung=max_rung
+    )
+    # Bracket `s` starts individuals on rung `s`, i.e. its early-stopping rate is `s`.
+    brackets = [
+        _Bracket(
+            {rung: rung_resources[rung] for rung in range(s, max_rung + 1)},
+            reduction_factor,
+            max_eval_time=600 if max_eval_time is None else max_eval_time,
+            resource=resource,
+            warm_start=warm_start_promotions,
+        )
+        for s in range(max_rung + 1)
+    ]
+    n_running = [0 for _ in brackets]
+
+    def new_individual() -> Individual:
+        if start_candidates:
+            return start_candidates.pop()
+        return operations.individual()
+
+    def highest_rung_individuals() -> List[Individual]:
+        reached = [
+            b.highest_rung_reached for b in brackets if any(b.rung_individuals.values())
+        ]
+        if not reached:
+            return []
+        highest = max(reached)
+        return [
+            individual
+            for bracket in brackets
+            if highest in bracket.rung_individuals
+            for _, individual in bracket.rung_individuals[highest]
+        ]
+
+    try:
+        with AsyncEvaluator() as async_:
+            log.info("Hyperband start")
+
+            def start_new_job(weights: List[float]):
+                s = min(range(len(brackets)), key=lambda i: n_running[i] / weights[i])
+                individual, rung = brackets[s].get_job(new_individual)
+                individual.meta["bracket"] = s
+                n_running[s] += 1
+                timeout = brackets[s].timeout(rung)
+                async_.submit(
+                    evaluate,
+                    individual,
+                    rung,
+                    **brackets[s].rung_kwargs(rung),
+                    timeout=timeout,
+                    time_limit=1.2 * timeout + 5,
+                    priority=rung,
+                )
+
+            def fill_idle_workers():
+                # See `asha`, jobs are only created once a worker can start on them.
+                weights = bracket_weights(brackets, max_rung)
+                while async_.job_queue_size < 0 or len(async_.futures) == 0:
+                    start_new_job(weights)
+
+            fill_idle_workers()
+
+            while (max_full_evaluations is None) or (
+                sum(len(b.rung_individuals[max_rung]) for b in brackets)
+                < max_full_evaluations
+            ):
+                # Retrying on less data would rank the result on the wrong rung.
+                future = operations.wait_next(async_, retry_memory_errors=False)
+                s = future.args[0].meta["bracket"]
+                n_running[s] -= 1
+                if future.result is not None:
+                    brackets[s].add_result(future.result)
+                fill_idle_workers()
+    except stopit.TimeoutException:
+        log.info("Hyperband ended due to timeout.")
+    finally:
+        weights = bracket_weights(brackets, max_rung)
+        for s, bracket in enumerate(brackets):
+            counts = {
+                rung: len(inds) for rung, inds in bracket.rung_individuals.items()
+            }
+            log.info(f"Bracket {s} (weight {weights[s]:.2f}): {counts}")
+        return highest_rung_individuals()
@@ -37,38 +37,59 @@ class Evaluation:
         self.error = error
         self.pid = pid
         self._cache_file = ""
+        self._predictions_file = ""
+        # Hits and misses on the cache of fitted preprocessing steps, if used.
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # True if evaluation stopped before all folds were evaluated,
+        # `score` is then the mean over the evaluated folds only.
+        self.race_aborted = False
+        # True if the score was read from the evaluation store, or was computed
+        # partly from folds or estimators in the fold cache.
+        self.reused = False
 
         if isinstance(predictions, (pd.Series, pd.DataFrame)):
             predictions = predictions.values
         self._predictions: Optional[np.ndarray] = predictions
 
     def to_disk(self, directory: str) -> None:
-        """Save Evaluation in the provided directory."""
-        self._cache_file = os.path.join(directory, f"{str(self.individual._id)}.pkl")
+        """Save Evaluation in the provided directory.
+
+        Estimators are pickled to `<id>.pkl`, predictions are saved to `<id>.npy`
+        so that they can be memory-mapped without loading the estimators.
+        """
+        path = os.path.join(directory, str(self.individual._id))
+        self._cache_file = f"{path}.pkl"
         with open(self._cache_file, "wb") as fh:
-            pickle.dump((self._estimators, self._predictions), fh)
+            pickle.dump(self._estimators, fh)
+        if self._predictions is not None:
+            self._predictions_file = f"{path}.npy"
+            np.save(self._predictions_file, self._predictions, allow_pickle=True)
         self._estimators, self._predictions = [], None
 
     def remove_from_disk(self) -> None:
-        """Remove the related file from disk."""
-        os.remove(os.path.join(self._cache_file))
-        self._cache_file = ""
+        """Remove the related files from disk."""
+        for file in [self._cache_file, self._predictions_file]:
+            if file:
+                os.remove(file)
+        self._cache_file, self._predictions_file = "", ""
 
     @property
     def estimators(self) -> List[BaseEstimator]:
         if self._estimators or not self._cache_file:
             return self._estimators
         with open(self._cache_file, "rb") as fh:
-            estimators, _ = pickle.load(fh)
-            return estimators
+            return pickle.load(fh)
 
     @property
     def predictions(self):
-        if self._predictions is not None or not self._cache_file:
+        if self._predictions is not None or not self._predictions_file:
             return self._predictions
-        with open(self._cache_file, "rb") as fh:
-            _, predictions = pickle.load(fh)
-            return predictions
+        try:
+            return np.load(self._predictions_file, mmap_mode="r")
+        except ValueError:
+            # Arrays of Python objects (e.g. string labels) can not be memory-mapped.
+            return np.load(self._predictions_file, allow_pickle=True)
 
     # Is there a better way to do this?
     # Assignment in __init__ is not preferred even if it saves lines.
@@ -144,15 +165,15 @@ class EvaluationLibrary:
         self.other_evaluations: List[Evaluation] = []
         self._m = m
         self._sample_n = n
-        self.lookup: Dict[str, Evaluation] = {}
+        self.lookup: Dict[Tuple[str, ...], Evaluation] = {}
         self._cache = os.path.expandvars(cache)
         if not os.path.exists(self._cache):
             os.mkdir(self._cache)
 
-        def main_node_str(e: Evaluation):
-            return str(e.individual.main_node)
+        def structure_key(e: Evaluation):
+            return e.individual.structure_key
 
-        self._lookup_key = main_node_str
+        self._lookup_key = structure_key
 
         if sample is not None:
             self._sample = sample
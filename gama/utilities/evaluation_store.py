@@ -0,0 +1,167 @@
+"""
+Persist scores of evaluated pipelines across runs in an SQLite database.
+
+Scores are only reused if they were obtained on the same data, with the same
+cross-validation configuration and metrics, and by the same `EVALUATION_VERSION`.
+Predictions and fitted estimators
+are not stored.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from typing import List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from gama.utilities.metrics import Metric
+
+log = logging.getLogger(__name__)
+
+# Version of how pipelines are evaluated. Increase it whenever a change makes scores
+# incomparable to stored ones, e.g. a change in how rows are subsampled, so that
+# scores stored before the change are not reused.
+EVALUATION_VERSION = 2
+
+
+def dataset_fingerprint(x: pd.DataFrame, y: Union[pd.Series, pd.DataFrame]) -> str:
+    """Hash of the values, column names and dtypes of `x` and `y`."""
+    fingerprint = hashlib.sha256()
+    for data in [x, y]:
+        fingerprint.update(pd.util.hash_pandas_object(data, index=True).values)
+        columns = data.columns if isinstance(data, pd.DataFrame) else [data.name]
+        dtypes = data.dtypes if isinstance(data, pd.DataFrame) else [data.dtype]
+        fingerprint.update(repr(list(zip(columns, map(str, dtypes)))).encode())
+    return fingerprint.hexdigest()
+
+
+class EvaluationStore:
+    """Stores the scores of evaluated pipelines in an SQLite database.
+
+    The store may be shared by processes and by consecutive runs.
+    Each process or worker thread opens its own connection on first use.
+
+    Parameters
+    ----------
+    path: str
+        Path of the SQLite database, it is created if it does not exist.
+    x: pandas.DataFrame
+        Features the pipelines are evaluated on.
+    y: pandas.Series or pandas.DataFrame
+        Targets the pipelines are evaluated on.
+    metrics: Sequence[Metric]
+        Metrics the pipelines are scored with, in order.
+    cv: int (default=5)
+        Number of cross-validation folds the pipelines are evaluated with.
+    """
+
+    per_worker = True  # See `AsyncEvaluator`, worker threads get their own copy.
+
+    def __init__(
+        self,
+        path: str,
+        x: pd.DataFrame,
+        y: Union[pd.Series, pd.DataFrame],
+        metrics: Sequence[Metric],
+        cv: int = 5,
+    ):
+        self._path = os.path.abspath(os.path.expanduser(path))
+        context = dict(
+            version=EVALUATION_VERSION,
+            data=dataset_fingerprint(x, y),
+            metrics=[metric.name for metric in metrics],
+            cv=cv,
+        )
+        self.context = hashlib.sha256(json.dumps(context).encode()).hexdigest()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS evaluations ("
+                "context TEXT NOT NULL, pipeline TEXT NOT NULL, "
+                "subsample REAL NOT NULL, score TEXT NOT NULL, duration REAL, "
+                "PRIMARY KEY (context, pipeline, subsample))"
+            )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_connection=None, _pid=None)  # Connect again in each process.
+        return state
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None or self._pid != os.getpid():
+            # Connections can not be used across a fork.
+            self._connection = sqlite3.connect(self._path, timeout=30)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(
+        self, pipeline: str, subsample: Optional[Union[int, float]] = None
+    ) -> Optional[Tuple[float, ...]]:
+        """Return the scores of `pipeline` if it was evaluated before, else None.
+
+        Parameters
+        ----------
+        pipeline: str
+            The pipeline as formatted by `Individual.pipeline_str`.
+        subsample: int or float, optional (default=None)
+            Number (if int) or fraction (if float) of rows the pipeline was evaluated
+            on, None if it used all data.
+        """
+        try:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT score FROM evaluations "
+                    "WHERE context = ? AND pipeline = ? AND subsample = ?",
+                    (self.context, pipeline, -1 if subsample is None else subsample),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            log.warning(f"Could not read from evaluation store: {e}")
+            return None
+        return None if row is None else tuple(json.loads(row[0]))
+
+    def save(
+        self,
+        pipeline: str,
+        score: Tuple[float, ...],
+        duration: float,
+        subsample: Optional[Union[int, float]] = None,
+    ) -> None:
+        """Store the scores of `pipeline`, see `get`."""
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?)",
+                    (
+                        self.context,
+                        pipeline,
+                        -1 if subsample is None else subsample,
+                        json.dumps(list(score)),
+                        duration,
+                    ),
+                )
+        except sqlite3.Error as e:
+            log.warning(f"Could not write to evaluation store: {e}")
+
+    def all_scores(self) -> List[Tuple[str, Tuple[float, ...]]]:
+        """Return all pipelines evaluated on all data, with their scores."""
+        try:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT pipeline, score FROM evaluations "
+                    "WHERE context = ? AND subsample = -1",
+                    (self.context,),
+                )
+                .fetchall()
+            )
+        except sqlite3.Error as e:
+            log.warning(f"Could not read from evaluation store: {e}")
+            return []
+        return [(pipeline, tuple(json.loads(score))) for pipeline, score in rows]
@@ -15,25 +15,43 @@ but it has issues:
       I don't want errors for expected behavior.
 """
 
+import collections
 import contextlib
+import copy
 import datetime
 import gc
+import heapq
+import itertools
 import logging
 import multiprocessing
+import multiprocessing.connection
+import multiprocessing.queues
 import os
 import psutil
 import queue
 import struct
+import threading
 import time
 import traceback
-from typing import Optional, Callable, Dict, List
+from typing import Optional, Callable, Deque, Dict, List, Tuple, Union
 import uuid
 
 from psutil import NoSuchProcess
 
+try:
+    import resource
+except ImportError:  # The resource module is not available on Windows.
+    resource = None  # type: ignore
 
 log = logging.getLogger(__name__)
 
+# Environment variable with the key remote worker agents authenticate with.
+AUTHKEY_VARIABLE = "GAMA_WORKER_AUTHKEY"
+# Seconds between heartbeats of remote worker agents,
+# and seconds after which an agent without heartbeat is considered lost.
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_TIMEOUT = 10.0
+
 
 class AsyncFuture:
     """Reference to a function call executed on a different process."""
@@ -46,6 +64,9 @@ class AsyncFuture:
         self.result = None
         self.exception = None
         self.traceback = None
+        # Maximum wall-clock time in seconds a worker may spend on this future.
+        self.time_limit: Optional[float] = None
+        self.priority: float = 0
 
     def execute(self, extra_kwargs):
         """Execute the function call `fn(*args, **kwargs)` and record results."""
@@ -63,6 +84,9 @@ class AsyncEvaluator:
 
     The function and all its arguments must be picklable.
     Using the same AsyncEvaluator in two different contexts raises a `RuntimeError`.
+    Alternatively, functions can be evaluated on threads of the main process,
+    which avoids copying arguments and results between processes,
+    or by worker agents on other machines (see `remote_worker`).
 
     defaults: Dict, optional (default=None)
         Default parameter values shared between all submit calls.
@@ -79,6 +103,12 @@ class AsyncEvaluator:
         memory_limit_mb: Optional[int] = None,
         logfile: Optional[str] = None,
         wait_time_before_forced_shutdown: int = 10,
+        monitor_interval: float = 1.0,
+        time_limit: Optional[float] = None,
+        worker_memory_limit_mb: Optional[int] = None,
+        max_tasks_per_worker: Optional[int] = None,
+        max_worker_rss_growth_mb: Optional[float] = None,
+        backend: str = "processes",
     ):
         """
         Parameters
@@ -94,8 +124,59 @@ class AsyncEvaluator:
         wait_time_before_forced_shutdown : int (default=10)
             Number of seconds to wait between asking the worker processes to shut down
             and terminating them forcefully if they failed to do so.
+        monitor_interval: float (default=1.0)
+            Number of seconds between memory usage samples and checks of time limits.
+            Memory usage is sampled by a background thread, only if `memory_limit_mb`
+            or `logfile` is set.
+        time_limit: float, optional (default=None)
+            Default maximum number of wall-clock seconds a worker may spend on a single
+            future, see `submit`. If None, there is no limit.
+        worker_memory_limit_mb: int, optional (default=None)
+            If set, the address space of each subprocess is limited to this many
+            megabytes by the operating system, so allocations beyond it raise a
+            `MemoryError` within the subprocess. Address space includes memory which
+            is reserved or memory-mapped but not used. Only supported on Unix-like
+            systems. If None, subprocesses are only limited by `memory_limit_mb`.
+        max_tasks_per_worker: int, optional (default=None)
+            If set, a subprocess is replaced by a new one after it completed this
+            many futures. If None, the number of futures per subprocess is unlimited.
+        max_worker_rss_growth_mb: float, optional (default=None)
+            If set, a subprocess is replaced by a new one once its resident memory
+            grew by more than this many megabytes since completing its first future.
+            Subprocesses are only replaced in between futures, so no work is lost.
+            If None, subprocesses are not replaced because of their memory growth.
+        backend: str (default="processes")
+            Either "processes" or "threads". With "threads", workers are threads of
+            the main process and share its memory, so nothing is pickled.
+            This only pays off if evaluations are short or mostly release the GIL.
+            Threads can not be terminated, so `memory_limit_mb`, `time_limit`,
+            `worker_memory_limit_mb`, `max_tasks_per_worker` and
+            `max_worker_rss_growth_mb` are ignored. The `defaults` are shared by
+            all threads, except for those with a true `per_worker` attribute (e.g.
+            a `PrefixCache`), of which each thread gets a (shallow) copy.
+            With "tcp://host:port", functions are evaluated by worker agents which
+            connect to that address, see `remote_worker`. Any number of agents may
+            connect at any time, each receives the `defaults` once and evaluates
+            one future at a time. Futures of agents which disconnect or stop sending
+            heartbeats are queued again. `n_workers` and the options which apply to
+            subprocesses are ignored, agents exceeding `time_limit` are disconnected.
+            Agents must authenticate with the key in the `GAMA_WORKER_AUTHKEY`
+            environment variable, as the connection is used to send pickled data.
         """
+        self._address: Optional[Tuple[str, int]] = None
+        if backend.startswith("tcp://"):
+            host, _, port = backend[len("tcp://") :].rpartition(":")
+            self._address = (host, int(port))
+            if not os.environ.get(AUTHKEY_VARIABLE):
+                raise ValueError(f"Set {AUTHKEY_VARIABLE} to use backend '{backend}'.")
+            backend = "tcp"
+        elif backend not in ["processes", "threads"]:
+            raise ValueError(f"Unknown backend '{backend}'.")
         self._has_entered = False
+        self._backend = backend
+        self._threads: List[threading.Thread] = []
+        self._listener: Optional[multiprocessing.connection.Listener] = None
+        self._closing = threading.Event()
         self.futures: Dict[uuid.UUID, AsyncFuture] = {}
         self._processes: List[psutil.Process] = []
         self._n_jobs = n_workers
@@ -104,17 +185,41 @@ class AsyncEvaluator:
         self._mem_behaved = 0
         self._logfile = logfile
         self._wait_time_before_forced_shutdown = wait_time_before_forced_shutdown
-
-        # queue.qsize() may raise an error on Unix-like,
-        # more accurate results may be obtained by using a multiprocessing.Value
-        # but it adds a point of failure and I hope to replace this async
-        # module soon, so we use this approximation.
-        # Since we assume all workers will take up a job, we start below 0:
-        self.job_queue_size = -n_workers
-
-        self._input: multiprocessing.Queue = multiprocessing.Queue()
-        self._output: multiprocessing.Queue = multiprocessing.Queue()
-        self._command: multiprocessing.Queue = multiprocessing.Queue()
+        self._monitor_interval = monitor_interval
+        self._time_limit = time_limit
+        self._worker_memory_limit_mb = worker_memory_limit_mb
+        self._max_tasks_per_worker = max_tasks_per_worker
+        self._max_worker_rss_growth_mb = max_worker_rss_growth_mb
+        if worker_memory_limit_mb is not None and resource is None:
+            log.warning("Can not limit memory of subprocesses on this platform.")
+        # Workers are identified by their pid, or the ident of their (serving) thread.
+        # Each worker gets its own input queue, which holds at most one future.
+        self._inputs: Dict[int, Union[queue.Queue, multiprocessing.Queue]] = {}
+        self._idle: Deque[int] = collections.deque()
+        # Maps a busy worker to the id and start time of the future it runs,
+        # and the id of each running future to its worker.
+        self._running: Dict[int, Tuple[uuid.UUID, float]] = {}
+        self._assigned: Dict[uuid.UUID, int] = {}
+        # Number of completed futures and resident memory after the first, by pid.
+        self._n_tasks: Dict[int, int] = {}
+        self._baseline_rss: Dict[int, float] = {}
+        # Workers which were asked to stop after their last future.
+        self._retired: List[psutil.Process] = []
+        # Futures not yet passed to workers, as (-priority, submission, future).
+        self._pending: List[Tuple[float, int, AsyncFuture]] = []
+        self._submission = itertools.count()
+        # The monitor thread may restart workers, so any access to the process pool,
+        # or to which worker runs which future, must be guarded by this lock.
+        self._lock = threading.RLock()
+        self._stop_monitor = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+
+        # Threads share memory, so their futures do not need to be pickled.
+        self._queue_type = (
+            multiprocessing.Queue if backend == "processes" else queue.Queue
+        )
+        self._output = self._queue_type()
+        self._command = self._queue_type()
 
         pid = os.getpid()
         self._main_process = psutil.Process(pid)
@@ -126,58 +231,108 @@ class AsyncEvaluator:
             )
         self._has_entered = True
 
-        self._input = multiprocessing.Queue()
-        self._output = multiprocessing.Queue()
+        self._output = self._queue_type()
 
         log.debug(
-            f"Process {self._main_process.pid} starting {self._n_jobs} subprocesses."
+            f"Process {self._main_process.pid} starting {self._n_jobs} {self._backend}."
         )
-        for _ in range(self._n_jobs):
-            self._start_worker_process()
+        if self._backend == "tcp":
+            self._start_listener()
+        for _ in range(0 if self._backend == "tcp" else self._n_jobs):
+            if self._backend == "threads":
+                self._start_worker_thread()
+            else:
+                self._start_worker_process()
         self._log_memory_usage()
+
+        # Time limits may be set on any submitted future, so always monitor.
+        self._stop_monitor.clear()
+        self._monitor = threading.Thread(
+            target=self._monitor_workers, name="gama-monitor", daemon=True
+        )
+        self._monitor.start()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._monitor is not None:
+            self._stop_monitor.set()
+            self._monitor.join()
+            self._monitor = None
+
+        if self._backend == "tcp":
+            self._stop_listener()
+
         log.debug(f"Signaling {len(self._processes)} subprocesses to stop.")
 
         for _ in self._processes:
             self._command.put("stop")
+        for thread in self._threads:
+            # Futures the thread did not start yet are dropped. A busy thread can not
+            # be interrupted, it reads its stop sentinel once its evaluation ends.
+            self.clear_queue(self._inputs[thread.ident])
+            self._inputs.pop(thread.ident).put(None)
 
         for _ in range(self._wait_time_before_forced_shutdown + 1):
             if self._command.empty():
                 break
             time.sleep(1)
 
-        self.clear_queue(self._input)
+        for input_queue in self._inputs.values():
+            self.clear_queue(input_queue)
         self.clear_queue(self._output)
         self.clear_queue(self._command)
-        self.job_queue_size = -self._n_jobs
+        self._inputs, self._running, self._assigned = {}, {}, {}
+        self._n_tasks, self._baseline_rss = {}, {}
+        self._idle.clear()
+        self._pending = []
+        self._threads = []
 
         # Even processes which 'stop' need to be 'waited',
         # otherwise they become zombie processes.
+        self._processes.extend(self._retired)
+        self._retired = []
         while len(self._processes) > 0:
             try:
                 self._stop_worker_process(self._processes[0])
             except psutil.NoSuchProcess:
-                self.job_queue_size -= 1
                 self._processes.remove(self._processes[0])
         return False
 
-    def clear_queue(self, q: multiprocessing.Queue):
+    def clear_queue(self, q: Union[queue.Queue, multiprocessing.Queue]):
         while not q.empty():
             with contextlib.suppress(queue.Empty):
                 q.get(timeout=0.001)
-        q.close()
+        if isinstance(q, multiprocessing.queues.Queue):
+            q.close()
 
-    def submit(self, fn: Callable, *args, **kwargs) -> AsyncFuture:
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        time_limit: Optional[float] = None,
+        priority: float = 0,
+        **kwargs,
+    ) -> AsyncFuture:
         """Submit fn(*args, **kwargs) to be evaluated on a subprocess.
 
+        Futures wait in a priority queue of the main process, and are passed on to
+        a worker only once it is idle, so no future is committed to a worker early.
+
         Parameters
         ----------
         fn: Callable
             Function to call on a subprocess.
         args
             Positional arguments to call `fn` with.
+        time_limit: float, optional (default=None)
+            Maximum number of wall-clock seconds a worker may spend on the call.
+            If it takes longer, the worker is terminated and replaced, and the future
+            is completed with a `TimeoutError` as `exception`.
+            Unlike timeouts within `fn`, this also interrupts non-Python code.
+            If None, the `time_limit` of the AsyncEvaluator is used.
+        priority: float (default=0)
+            Waiting futures with higher priority are evaluated first,
+            futures with equal priority are evaluated in order of submission.
         kwargs
             Keyword arguments to call `fn` with.
 
@@ -188,19 +343,84 @@ class AsyncEvaluator:
             once evaluation is finished.
         """
         future = AsyncFuture(fn, *args, **kwargs)
+        future.time_limit = self._time_limit if time_limit is None else time_limit
+        future.priority = priority
         self.futures[future.id] = future
-        self._input.put(future)
-        self.job_queue_size += 1
+        self._enqueue(future)
         return future
 
-    def wait_next(self, poll_time: float = 0.05) -> AsyncFuture:
+    @property
+    def job_queue_size(self) -> int:
+        """Number of futures waiting for a worker, minus the number of idle workers.
+
+        It is negative only if workers are idle, so a new future submitted while
+        it is negative is evaluated right away.
+        """
+        with self._lock:
+            return len(self._pending) - len(self._idle)
+
+    def _enqueue(self, future: AsyncFuture):
+        """Add `future` to the futures waiting for a worker."""
+        with self._lock:
+            entry = (-future.priority, next(self._submission), future)
+            heapq.heappush(self._pending, entry)
+            self._dispatch()
+
+    def _dispatch(self):
+        """Pass waiting futures with the highest priority on to idle workers."""
+        with self._lock:
+            while self._pending and self._idle:
+                _, _, future = heapq.heappop(self._pending)
+                worker = self._idle.popleft()
+                self._running[worker] = (future.id, time.time())
+                self._assigned[future.id] = worker
+                self._inputs[worker].put(future)
+
+    def _add_worker(self, worker: int, input_queue: queue.Queue):
+        """Register a new idle `worker` which reads futures from `input_queue`."""
+        with self._lock:
+            self._inputs[worker] = input_queue
+            self._idle.append(worker)
+            self._dispatch()
+
+    def _remove_worker(self, worker: int) -> Optional[AsyncFuture]:
+        """Stop giving futures to `worker`, and return the future it ran, if any."""
+        with self._lock:
+            input_queue = self._inputs.pop(worker, None)
+            if isinstance(input_queue, multiprocessing.queues.Queue):
+                input_queue.close()
+            if worker in self._idle:
+                self._idle.remove(worker)
+            self._n_tasks.pop(worker, None)
+            self._baseline_rss.pop(worker, None)
+            future_id, _ = self._running.pop(worker, (None, None))
+            self._assigned.pop(future_id, None)
+            return self.futures.get(future_id)
+
+    def _release_worker(self, future_id: uuid.UUID):
+        """Mark the worker which completed `future_id` as idle, or retire it."""
+        with self._lock:
+            worker = self._assigned.pop(future_id, None)
+            if worker is None:
+                return  # Its worker was already removed, e.g. on a timeout.
+            self._running.pop(worker, None)
+            if self._should_retire(worker):
+                self._retire_worker_process(worker)
+            else:
+                self._idle.append(worker)
+            self._dispatch()
+
+    def wait_next(self, poll_time: float = 0.5) -> AsyncFuture:
         """Wait until an AsyncFuture has been completed and return it.
 
+        Returns as soon as a subprocess puts a completed future on the output queue.
 
         Parameters
         ----------
-        poll_time: float (default=0.05)
-            Time to sleep between checking if a future has been completed.
+        poll_time: float (default=0.5)
+            Maximum time to block at once while waiting for a completed future.
+            Timeouts raised in this thread (e.g. by `stopit`) are handled only
+            between blocks, so this bounds how late such a timeout is processed.
 
         Returns
         -------
@@ -215,15 +435,14 @@ class AsyncEvaluator:
         if len(self.futures) == 0:
             raise RuntimeError("No Futures queued, must call `submit` first.")
         while True:
-            self._control_memory_usage()
-            self._log_memory_usage()
-
             try:
-                completed_future = self._output.get(block=False)
-                self.job_queue_size -= 1
+                completed_future = self._output.get(block=True, timeout=poll_time)
             except queue.Empty:
-                time.sleep(poll_time)
                 continue
+            if completed_future.id not in self.futures:
+                # The worker finished just as its future was completed on a timeout.
+                continue
+            self._release_worker(completed_future.id)
 
             match = self.futures.pop(completed_future.id)
             match.result, match.exception, match.traceback = (
@@ -234,24 +453,239 @@ class AsyncEvaluator:
             self._mem_behaved += 1
             return match
 
+    def _monitor_workers(self):
+        """Periodically enforce time limits and control memory until signalled."""
+        while not self._stop_monitor.wait(self._monitor_interval):
+            try:
+                with self._lock:
+                    self._reap_retired_workers()
+                    self._enforce_time_limits()
+                    self._control_memory_usage()
+                    self._log_memory_usage()
+            except Exception:
+                # A failing monitor should never bring down the search.
+                log.warning("Error while monitoring workers.", exc_info=True)
+
+    def _should_retire(self, worker: int) -> bool:
+        """Whether the worker process `worker` should be replaced before its next task.
+
+        Counts the task it just completed, and measures its memory growth.
+        """
+        process = next((p for p in self._processes if p.pid == worker), None)
+        if process is None:
+            return False  # Threads and remote agents are never retired.
+        self._n_tasks[worker] = self._n_tasks.get(worker, 0) + 1
+        if self._n_tasks[worker] == self._max_tasks_per_worker:
+            return True
+        if self._max_worker_rss_growth_mb is None:
+            return False
+        try:
+            rss = process.memory_info().rss / (2**20)
+        except NoSuchProcess:
+            return False  # It is replaced by the monitor.
+        baseline = self._baseline_rss.setdefault(worker, rss)
+        return rss - baseline > self._max_worker_rss_growth_mb
+
+    def _retire_worker_process(self, pid: int):
+        """Ask the idle worker `pid` to stop, and start a new one in its place."""
+        log.debug(f"Replacing retired worker {pid}.")
+        process = next(p for p in self._processes if p.pid == pid)
+        # The process exits by itself, so the queues it uses are left intact.
+        self._inputs[pid].put(None)
+        self._remove_worker(pid)
+        self._processes.remove(process)
+        self._retired.append(process)
+        self._start_worker_process()
+
+    def _reap_retired_workers(self):
+        """Wait for retired workers which exited, so they do not become zombies."""
+        for process in list(self._retired):
+            with contextlib.suppress(psutil.TimeoutExpired):
+                process.wait(timeout=0)
+                self._retired.remove(process)
+
+    def _enforce_time_limits(self):
+        """Terminate workers which exceed the time limit of their future.
+
+        The worker is replaced, and its future is put on the output queue
+        with a `TimeoutError` as exception.
+        """
+        now = time.time()
+        for process in list(self._processes):
+            future_id, start = self._running.get(process.pid, (None, now))
+            future = self.futures.get(future_id)
+            if future is None or future.time_limit is None:
+                continue
+            if now - start <= future.time_limit:
+                continue
+
+            log.info(
+                f"Terminating {process.pid} because its evaluation exceeded "
+                f"the time limit of {future.time_limit} seconds."
+            )
+            self._stop_worker_process(process)
+            self._start_worker_process()
+            self._fail_running_future(
+                process.pid,
+                TimeoutError(f"Exceeded time limit of {future.time_limit} seconds."),
+            )
+
+    def _fail_running_future(self, worker: int, exception: Exception):
+        """Complete the future the (removed) `worker` ran with `exception`."""
+        future = self._remove_worker(worker)
+        if future is not None:
+            future.exception = exception
+            self._output.put(future)
+
     def _start_worker_process(self) -> psutil.Process:
         """Start a new worker node and add it to the process pool."""
+        input_queue = self._queue_type()
         mp_process = multiprocessing.Process(
             target=evaluator_daemon,
-            args=(self._input, self._output, self._command, AsyncEvaluator.defaults),
+            args=(
+                input_queue,
+                self._output,
+                self._command,
+                AsyncEvaluator.defaults,
+                self._worker_memory_limit_mb,
+            ),
             daemon=True,
         )
-        mp_process.start()
-        subprocess = psutil.Process(mp_process.pid)
-        self._processes.append(subprocess)
+        with self._lock:
+            mp_process.start()
+            subprocess = psutil.Process(mp_process.pid)
+            self._processes.append(subprocess)
+            self._add_worker(subprocess.pid, input_queue)
         return subprocess
 
+    def _start_worker_thread(self) -> threading.Thread:
+        """Start a new worker thread and add it to the thread pool."""
+        # Data (e.g. `x`) is shared, copying a DataFrame would copy its values.
+        defaults = {
+            k: copy.copy(v) if getattr(v, "per_worker", False) else v
+            for k, v in AsyncEvaluator.defaults.items()
+        }
+        input_queue = self._queue_type()
+        thread = threading.Thread(
+            target=evaluator_daemon,
+            args=(input_queue, self._output, self._command, defaults),
+            name="gama-worker",
+            daemon=True,
+        )
+        thread.start()
+        self._threads.append(thread)
+        self._add_worker(thread.ident, input_queue)
+        return thread
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        """The address remote agents connect to, only with the "tcp" backend."""
+        if self._listener is not None:
+            return self._listener.address
+        return self._address
+
+    def _start_listener(self):
+        """Accept connections from remote agents on a background thread."""
+        self._closing.clear()
+        self._listener = multiprocessing.connection.Listener(
+            self._address, authkey=os.environ[AUTHKEY_VARIABLE].encode()
+        )
+        thread = threading.Thread(
+            target=self._accept_agents, name="gama-listener", daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+
+    def _accept_agents(self):
+        while not self._closing.is_set():
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError) as e:
+                if not self._closing.is_set():
+                    log.warning(f"Worker agent failed to connect: {e}")
+                continue
+            if self._closing.is_set():
+                connection.close()
+                break
+            thread = threading.Thread(
+                target=self._serve_agent,
+                args=(connection,),
+                name="gama-agent",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _stop_listener(self):
+        self._closing.set()
+        # `accept` is not interrupted by closing the listener, so connect to it.
+        host, port = self.address
+        with contextlib.suppress(OSError, EOFError):
+            multiprocessing.connection.Client(
+                ("localhost" if host in ["", "0.0.0.0"] else host, port),
+                authkey=os.environ[AUTHKEY_VARIABLE].encode(),
+            ).close()
+        self._listener.close()
+        for thread in self._threads:
+            thread.join(timeout=HEARTBEAT_TIMEOUT)
+        self._threads = []
+
+    def _serve_agent(self, connection: multiprocessing.connection.Connection):
+        """Send futures to a remote agent one at a time and collect their results.
+
+        Futures of an agent that disconnects or stops sending heartbeats are queued
+        again, an agent which exceeds the time limit of a future is disconnected.
+        """
+        agent = threading.get_ident()
+        input_queue: queue.Queue = queue.Queue()
+        try:
+            connection.send(("defaults", AsyncEvaluator.defaults))
+            self._add_worker(agent, input_queue)
+            while not self._closing.is_set():
+                try:
+                    future = input_queue.get(block=True, timeout=0.1)
+                except queue.Empty:
+                    continue
+                connection.send(("future", future))
+                start = last_message = time.time()
+                while not self._closing.is_set():
+                    if connection.poll(0.1):
+                        message, completed_future = connection.recv()
+                        last_message = time.time()
+                        if message == "result":
+                            self._output.put(completed_future)
+                            break
+                    elif time.time() - last_message > HEARTBEAT_TIMEOUT:
+                        raise ConnectionError(
+                            "Worker agent stopped sending heartbeats."
+                        )
+                    limit = future.time_limit
+                    if limit is not None and time.time() - start > limit:
+                        self._fail_running_future(
+                            agent,
+                            TimeoutError(f"Exceeded time limit of {limit} seconds."),
+                        )
+                        return
+            connection.send(("stop", None))
+        except (OSError, EOFError) as e:
+            log.info(f"Lost connection to worker agent: {e}")
+        finally:
+            lost_future = self._remove_worker(agent)
+            if lost_future is not None and not self._closing.is_set():
+                self._enqueue(lost_future)
+            connection.close()
+
     def _stop_worker_process(self, process: psutil.Process):
-        """Terminate a new worker node and remove it from the process pool."""
-        process.terminate()
-        process.wait(timeout=60)
-        self.job_queue_size -= 1
-        self._processes.remove(process)
+        """Terminate a worker node and remove it from the process pool.
+
+        Any future it was running must be completed with `_fail_running_future`.
+        """
+        with self._lock:
+            process.terminate()
+            process.wait(timeout=60)
+            self._processes.remove(process)
+            if process.pid in self._inputs and process.pid not in self._running:
+                self._remove_worker(process.pid)
 
     def _control_memory_usage(self, threshold=0.05):
         """Dynamically restarts or kills processes to adhere to memory constraints."""
@@ -275,6 +709,8 @@ class AsyncEvaluator:
         # ! Like the rest of this module, I hate to use custom code with this,
         # in particular there is a risk that terminating the process might leave
         # the multiprocess queue broken.
+        if not self._processes:
+            return  # Threads can not be terminated.
         mem_proc = list(self._get_memory_usage())
         if sum(map(lambda x: x[1], mem_proc)) > self._memory_limit_mb:
             log.info(
@@ -300,7 +736,9 @@ class AsyncEvaluator:
                 self._mem_violations = 0
                 log.info(f"Terminating {proc.pid} due to memory usage.")
                 self._stop_worker_process(proc)
-            # todo: update the Future of the evaluation that was terminated.
+            self._fail_running_future(
+                proc.pid, MemoryError("Terminated due to memory usage.")
+            )
 
     def _log_memory_usage(self):
         if not self._logfile:
@@ -321,6 +759,69 @@ class AsyncEvaluator:
                 # can never be the main process anyway
                 self._processes = [p for p in self._processes if p.pid != process.pid]
                 self._start_worker_process()
+                # Most likely it was killed by the operating system for lack of memory.
+                self._fail_running_future(
+                    process.pid, MemoryError("Worker process ended unexpectedly.")
+                )
+
+
+def remote_worker(
+    address: Tuple[str, int],
+    authkey: bytes,
+    heartbeat_interval: float = HEARTBEAT_INTERVAL,
+) -> None:
+    """Evaluate futures for an AsyncEvaluator with a "tcp://" backend at `address`.
+
+    Returns when the AsyncEvaluator closes the connection.
+
+    Parameters
+    ----------
+    address: Tuple[str, int]
+        Host and port of the AsyncEvaluator.
+    authkey: bytes
+        Key to authenticate with, see `AsyncEvaluator`.
+    heartbeat_interval: float (default=HEARTBEAT_INTERVAL)
+        Seconds between messages which tell the AsyncEvaluator this agent still runs.
+    """
+    connection = multiprocessing.connection.Client(address, authkey=authkey)
+    send_lock = threading.Lock()
+    stop_heartbeat, busy = threading.Event(), threading.Event()
+
+    def send(message):
+        with send_lock:
+            connection.send(message)
+
+    def send_heartbeats():
+        # Heartbeats are only read while the AsyncEvaluator waits for a result.
+        while not stop_heartbeat.wait(heartbeat_interval):
+            if busy.is_set():
+                with contextlib.suppress(OSError):
+                    send(("heartbeat", None))
+
+    heartbeat = threading.Thread(target=send_heartbeats, daemon=True)
+    heartbeat.start()
+    try:
+        _, default_parameters = connection.recv()
+        while True:
+            message, future = connection.recv()
+            if message == "stop":
+                break
+            busy.set()
+            try:
+                future.execute(default_parameters)
+                send(("result", future))
+            except (MemoryError, struct.error) as e:
+                future.result = None
+                future.exception = str(type(e))
+                gc.collect()
+                send(("result", future))
+            finally:
+                busy.clear()
+    except (OSError, EOFError):
+        log.info("Lost connection to the AsyncEvaluator.")
+    finally:
+        stop_heartbeat.set()
+        connection.close()
 
 
 def evaluator_daemon(
@@ -328,14 +829,15 @@ def evaluator_daemon(
     output_queue: queue.Queue,
     command_queue: queue.Queue,
     default_parameters: Optional[Dict] = None,
+    memory_limit_mb: Optional[int] = None,
 ):
     """Function for daemon subprocess that evaluates functions from AsyncFutures.
 
     Parameters
     ----------
     input_queue: queue.Queue[AsyncFuture]
-        Queue to get AsyncFuture from.
-        Queue should be managed by multiprocessing.manager.
+        Queue to get AsyncFuture from, this worker is the only one to read from it.
+        The daemon stops when it gets None.
     output_queue: queue.Queue[AsyncFuture]
         Queue to put AsyncFuture to.
         Queue should be managed by multiprocessing.manager.
@@ -345,21 +847,34 @@ def evaluator_daemon(
     default_parameters: Dict, optional (default=None)
         Additional parameters to pass to AsyncFuture.Execute.
         This is useful to avoid passing lots of repetitive data through AsyncFuture.
+    memory_limit_mb: int, optional (default=None)
+        If set, limit the address space of this process to `memory_limit_mb`.
     """
+    if memory_limit_mb is not None and resource is not None:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        soft = memory_limit_mb * (2**20)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
     try:
         while True:
             with contextlib.suppress(queue.Empty):
                 command_queue.get(block=False)
                 break
             try:
-                future = input_queue.get(block=False)
+                # Block briefly so idle workers do not spin, but do remain
+                # responsive to commands.
+                future = input_queue.get(block=True, timeout=0.1)
+                if future is None:
+                    break
                 future.execute(default_parameters)
                 if future.result:
                     if isinstance(future.result, tuple):
                         result = future.result[0]
                     else:
                         result = future.result
-                    if isinstance(result.error, MemoryError):
+                    if isinstance(getattr(result, "error", None), MemoryError):
                         # Can't pickle MemoryErrors. Should work around this later.
                         result.error = "MemoryError"
                         gc.collect()
@@ -370,7 +885,7 @@ def evaluator_daemon(
                 gc.collect()
                 output_queue.put(future)
             except queue.Empty:
-                pass
+                continue
     except Exception as e:
         # There are no plans currently for recovering from any exception:
         print(f"Stopping daemon:{type(e)}:{str(e)}")
@@ -0,0 +1,145 @@
+"""
+Share a pandas DataFrame or Series between processes without copying it.
+
+The data is written once to a file, after which any process can memory-map it.
+Only a small header (column names, dtypes and offsets into the file) is pickled,
+so sending a `SharedData` object to a subprocess is cheap regardless of data size.
+"""
+import os
+from typing import Any, List, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+class _Column(NamedTuple):
+    """Describes where the values of one column are stored in the file."""
+
+    name: Any
+    dtype: np.dtype
+    offset: int
+    categories: Optional[pd.CategoricalDtype] = None
+
+
+class SharedData:
+    """A DataFrame or Series stored in a memory-mapped file.
+
+    Parameters
+    ----------
+    data: pandas.DataFrame or pandas.Series
+        The data to share. Object columns are not supported.
+    path: str
+        File to write the data to. It is overwritten if it exists.
+        The file must remain available as long as `SharedData.data` may be accessed.
+
+    Raises
+    ------
+    TypeError
+        If `data` contains columns (or an index) with values of dtype `object`.
+    """
+
+    def __init__(self, data: Union[pd.DataFrame, pd.Series], path: str):
+        self._path = path
+        self._is_series = isinstance(data, pd.Series)
+        self._series_name = data.name if self._is_series else None
+        frame = data.to_frame() if isinstance(data, pd.Series) else data
+        self._n_rows = len(frame)
+        self._columns: List[_Column] = []
+        self._index: Union[range, _Column]
+
+        with open(path, "wb") as fh:
+            for name in frame.columns:
+                self._columns.append(self._write(fh, name, frame[name]))
+            if isinstance(frame.index, pd.RangeIndex):
+                self._index = range(
+                    frame.index.start, frame.index.stop, frame.index.step
+                )
+            else:
+                self._index = self._write(fh, frame.index.name, frame.index)
+
+        self._data: Optional[Union[pd.DataFrame, pd.Series]] = None
+
+    def _write(self, fh, name, values: Union[pd.Series, pd.Index]) -> _Column:
+        categories = None
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = values.dtype
+            codes = values.cat.codes if isinstance(values, pd.Series) else values.codes
+            array = np.asarray(codes)
+        else:
+            array = values.to_numpy()
+        if array.dtype == object:
+            raise TypeError(f"Can not share values of dtype object (of '{name}').")
+
+        # Align each column to its itemsize, so that columns of the same dtype
+        # are stored contiguously and can be mapped as one 2D block.
+        offset = fh.tell()
+        padding = -offset % array.dtype.itemsize
+        fh.write(b"\0" * padding)
+        np.ascontiguousarray(array).tofile(fh)
+        return _Column(name, array.dtype, offset + padding, categories)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_data"] = None  # Data is mapped again by the receiving process.
+        return state
+
+    @property
+    def data(self) -> Union[pd.DataFrame, pd.Series]:
+        """The shared DataFrame or Series, backed by the (read-only) file."""
+        if self._data is None:
+            self._data = self._load()
+        return self._data
+
+    def _load(self) -> Union[pd.DataFrame, pd.Series]:
+        if os.path.getsize(self._path) > 0:
+            buffer = np.memmap(self._path, dtype=np.uint8, mode="r")
+        else:
+            buffer = np.empty(0, dtype=np.uint8)
+
+        def view(column: _Column) -> np.ndarray:
+            nbytes = self._n_rows * column.dtype.itemsize
+            array = buffer[column.offset : column.offset + nbytes].view(column.dtype)
+            if column.categories is not None:
+                return pd.Categorical.from_codes(array, dtype=column.categories)
+            return array
+
+        if isinstance(self._index, range):
+            index = pd.RangeIndex(self._index.start, self._index.stop, self._index.step)
+        else:
+            index = pd.Index(view(self._index), name=self._index.name)
+
+        dtypes = {column.dtype for column in self._columns}
+        homogeneous = len(dtypes) == 1 and all(
+            column.categories is None for column in self._columns
+        )
+        if homogeneous and len(self._columns) > 1:
+            # Columns are stored back-to-back, so they form one (n_cols, n_rows) block,
+            # which pandas can then use as a single block without copying.
+            first = self._columns[0]
+            nbytes = len(self._columns) * self._n_rows * first.dtype.itemsize
+            block = buffer[first.offset : first.offset + nbytes].view(first.dtype)
+            block = block.reshape(len(self._columns), self._n_rows)
+            frame = pd.DataFrame(
+                block.T,
+                columns=[column.name for column in self._columns],
+                index=index,
+                copy=False,
+            )
+        else:
+            frame = pd.DataFrame(
+                {column.name: view(column) for column in self._columns},
+                index=index,
+                copy=False,
+            )
+
+        if self._is_series:
+            series = frame.iloc[:, 0]
+            series.name = self._series_name
+            return series
+        return frame
+
+    def remove(self) -> None:
+        """Remove the file backing the data, `data` will no longer be accessible."""
+        self._data = None
+        if os.path.exists(self._path):
+            os.remove(self._path)
@@ -0,0 +1,77 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from typing import List, Union
+
+from gama.utilities.generic.async_evaluator import AUTHKEY_VARIABLE, remote_worker
+
+
+def make_parser():
+    desc = (
+        "Evaluate pipelines for a GAMA search started with `backend='tcp://host:port'`."
+        f" Set the key to authenticate with in the {AUTHKEY_VARIABLE} environment"
+        " variable. Agents keep reconnecting, so they can serve consecutive searches."
+    )
+    parser = argparse.ArgumentParser(description=desc)
+    parser.add_argument("host", type=str, help="Host GAMA runs on.")
+    parser.add_argument("port", type=int, help="Port GAMA accepts agents on.")
+    parser.add_argument(
+        "-n",
+        dest="n_agents",
+        type=int,
+        default=1,
+        help="Number of agents to start, each evaluates one pipeline at a time.",
+    )
+    parser.add_argument(
+        "--retry",
+        dest="retry_s",
+        type=float,
+        default=1.0,
+        help="Seconds to wait before connecting again. (default=1)",
+    )
+    return parser
+
+
+def _run_agent(host: str, port: int, authkey: bytes, retry_s: float):
+    while True:
+        try:
+            remote_worker((host, port), authkey)
+        except (ConnectionRefusedError, multiprocessing.AuthenticationError) as e:
+            logging.debug(f"Could not connect: {e}")
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            # E.g. the host is unreachable, or the connection dropped mid-message.
+            logging.info(f"Connection failed, connecting again: {e!r}")
+        time.sleep(retry_s)
+
+
+def main(command: Union[str, List[str]] = ""):
+    parser = make_parser()
+    if isinstance(command, str):
+        command = command.split()
+    args = parser.parse_args(command) if command else parser.parse_args()
+
+    if not os.environ.get(AUTHKEY_VARIABLE):
+        parser.error(f"The {AUTHKEY_VARIABLE} environment variable must be set.")
+    authkey = os.environ[AUTHKEY_VARIABLE].encode()
+
+    agents = [
+        multiprocessing.Process(
+            target=_run_agent, args=(args.host, args.port, authkey, args.retry_s)
+        )
+        for _ in range(args.n_agents)
+    ]
+    for agent in agents:
+        agent.start()
+    try:
+        for agent in agents:
+            agent.join()
+    except KeyboardInterrupt:
+        for agent in agents:
+            agent.terminate()
+
+
+if __name__ == "__main__":
+    main()
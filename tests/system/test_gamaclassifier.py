@@ -11,7 +11,12 @@ from sklearn.metrics import accuracy_score, log_loss
 from sklearn.pipeline import Pipeline
 
 from gama.postprocessing import EnsemblePostProcessing
-from gama.search_methods import AsynchronousSuccessiveHalving, AsyncEA, RandomSearch
+from gama.search_methods import (
+    AsynchronousHyperband,
+    AsynchronousSuccessiveHalving,
+    AsyncEA,
+    RandomSearch,
+)
 from gama.search_methods.base_search import BaseSearch
 from gama.utilities.generic.stopwatch import Stopwatch
 from gama import GamaClassifier
@@ -199,6 +204,13 @@ def test_binary_classification_accuracy_asha():
     )
 
 
+def test_binary_classification_accuracy_hyperband():
+    """Binary classification, accuracy, numpy data, Hyperband search."""
+    _test_dataset_problem(
+        breast_cancer, "accuracy", search=AsynchronousHyperband(), max_time=60
+    )
+
+
 def test_binary_classification_accuracy_random_search():
     """Binary classification, accuracy, numpy data, random search."""
     _test_dataset_problem(breast_cancer, "accuracy", search=RandomSearch())
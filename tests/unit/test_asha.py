@@ -0,0 +1,63 @@
+from gama.search_methods import AsyncEA, AsynchronousSuccessiveHalving
+from gama.search_methods.asha import MIN_DURATIONS, NOT_FULL_EVALUATION, _Bracket
+from gama.utilities.evaluation_library import Evaluation
+
+
+def _evaluation(
+    individual, duration=1, error=NOT_FULL_EVALUATION, reused=False, score=-1.0, rung=0
+):
+    individual.meta["rung"] = rung
+    evaluation = Evaluation(individual, score=(score,), duration=duration, error=error)
+    evaluation.reused = reused
+    return evaluation
+
+
+def test_bracket_promotes_best_individual_once_enough_are_evaluated(SS_BNB):
+    bracket = _Bracket({0: 1 / 9, 1: 1 / 3, 2: 1.0}, 3, max_eval_time=100)
+    individuals = [SS_BNB.copy_as_new() for _ in range(9)]
+    scores = [0.1, 0.5, 0.3, 0.5, 0.2, 0.0, 0.4, 0.0, 0.0]
+
+    def new_individual():
+        return "new"
+
+    for individual, score in zip(individuals[:7], scores):
+        bracket.add_result(_evaluation(individual, score=score))
+    # Of 7 individuals 2 may be promoted, the best first and ties in order of arrival.
+    assert (individuals[1], 1) == bracket.get_job(new_individual)
+    assert (individuals[3], 1) == bracket.get_job(new_individual)
+    assert ("new", 0) == bracket.get_job(new_individual)
+
+    for individual, score in zip(individuals[7:], scores[7:]):
+        bracket.add_result(_evaluation(individual, score=score))
+    assert (individuals[6], 1) == bracket.get_job(new_individual)
+
+    bracket.add_result(_evaluation(individuals[1], score=0.6, rung=1))
+    assert [(0.5, 0.6)] == bracket.rung_pairs[0]
+    assert 1 == bracket.highest_rung_reached
+
+
+def test_bracket_timeout_ignores_durations_of_reused_and_failed_evaluations(SS_BNB):
+    bracket = _Bracket({0: 0.25, 1: 1.0}, reduction_factor=4, max_eval_time=100)
+    initial = bracket.timeout(0)
+    assert 35 == initial
+
+    for _ in range(MIN_DURATIONS):
+        bracket.add_result(_evaluation(SS_BNB, duration=0.01, reused=True))
+        bracket.add_result(_evaluation(SS_BNB, duration=0.01, error="MemoryError"))
+    assert initial == bracket.timeout(0)
+
+    for _ in range(MIN_DURATIONS):
+        bracket.add_result(_evaluation(SS_BNB, duration=1))
+    assert initial == bracket.timeout(0), "Fast evaluations should not shorten it."
+
+    for _ in range(MIN_DURATIONS):
+        bracket.add_result(_evaluation(SS_BNB, duration=30))
+    assert 60 == bracket.timeout(0)
+
+
+def test_asha_uses_fold_cache_only_to_continue_evaluations():
+    assert not AsyncEA().uses_fold_cache
+    assert not AsynchronousSuccessiveHalving().uses_fold_cache
+    assert AsynchronousSuccessiveHalving(resource="folds").uses_fold_cache
+    assert not AsynchronousSuccessiveHalving(resource="both").uses_fold_cache
+    assert AsynchronousSuccessiveHalving(warm_start_promotions=True).uses_fold_cache
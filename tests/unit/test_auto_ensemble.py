@@ -1,14 +1,26 @@
+from functools import partialmethod
+import time
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse
 from sklearn.svm import LinearSVC
 from sklearn.datasets import load_iris
 from sklearn.ensemble import VotingClassifier
+from sklearn.naive_bayes import GaussianNB
 
 from gama.genetic_programming.compilers.scikitlearn import compile_individual
 from gama.postprocessing.ensemble import (
     EnsemblePostProcessing,
     fit_and_weight,
     EnsembleClassifier,
+    EnsembleRegressor,
 )
 from gama.utilities.evaluation_library import Evaluation, EvaluationLibrary
+from gama.utilities.generic.async_evaluator import AsyncEvaluator
 from gama.utilities.metrics import Metric
 
 
@@ -52,3 +64,133 @@ def test_code_export_produces_working_code(GNB, ForestPipeline):
     assert isinstance(exported_ensemble, VotingClassifier)
     exported_ensemble.fit(x, y)
     assert 0.9 < exported_ensemble.score(x, y)
+
+
+def test_ensemble_refit_leaves_out_failed_pipelines(GNB, InvalidLinearSVC):
+    x, y = load_iris(return_X_y=True, as_frame=True)
+    GNB._to_pipeline = compile_individual
+    ensemble = EnsembleClassifier(
+        Metric("accuracy"), y, evaluation_library=EvaluationLibrary(n=None)
+    )
+    ensemble._models = {
+        "a": (Evaluation(GNB), 1),
+        "b": (Evaluation(InvalidLinearSVC), 2),
+    }
+
+    ensemble.fit(x, y, timeout=60, refit=True)
+
+    assert 1 == len(ensemble._fit_models)
+    pipeline, weight = ensemble._fit_models[0]
+    assert 1 == weight
+    assert 0.9 < (ensemble.predict(x) == y).mean()
+
+
+class _SlowGaussianNB(GaussianNB):
+    def fit(self, x, y, sample_weight=None):
+        time.sleep(0.5)
+        return super().fit(x, y, sample_weight)
+
+
+def test_ensemble_refit_is_not_limited_by_search_time_limit(monkeypatch):
+    x, y = load_iris(return_X_y=True, as_frame=True)
+    # Like Gama does, configure the AsyncEvaluator for (short) search evaluations.
+    init = partialmethod(
+        AsyncEvaluator.__init__,
+        n_workers=1,
+        memory_limit_mb=None,
+        logfile=None,
+        time_limit=0.1,
+        worker_memory_limit_mb=None,
+        max_tasks_per_worker=None,
+        max_worker_rss_growth_mb=None,
+        backend="processes",
+        monitor_interval=0.05,
+    )
+    monkeypatch.setattr(AsyncEvaluator, "__init__", init)
+    ensemble = EnsembleClassifier(
+        Metric("accuracy"), y, evaluation_library=EvaluationLibrary(n=None)
+    )
+    member = SimpleNamespace(individual=SimpleNamespace(pipeline=_SlowGaussianNB()))
+    ensemble._models = {"a": (member, 1)}
+
+    ensemble.fit(x, y, timeout=30, refit=True)
+
+    assert isinstance(ensemble._fit_models[0][0], _SlowGaussianNB)
+    assert hasattr(ensemble._fit_models[0][0], "classes_"), "It should be refit."
+
+
+def _ensemble_with_random_library(ensemble_class, metric, y, predict):
+    library = EvaluationLibrary(n=None)
+    rng = np.random.RandomState(0)
+    for i in range(30):
+        individual = SimpleNamespace(
+            _id=uuid.uuid4(), structure_key=(str(i),), short_name=lambda _: ""
+        )
+        evaluation = Evaluation(individual, predict(rng), (rng.random_sample(),))
+        library.save_evaluation(evaluation)
+    ensemble = ensemble_class(Metric(metric), y, evaluation_library=library)
+    ensemble.build_initial_ensemble(3)
+    return ensemble
+
+
+def _assert_batched_scores_match_per_candidate(ensemble):
+    weighted_sum = sum(
+        model.predictions * weight for model, weight in ensemble._models.values()
+    )
+    if scipy.sparse.issparse(weighted_sum):
+        weighted_sum = weighted_sum.toarray()
+    weighted_sum = weighted_sum.reshape(len(weighted_sum), -1)
+    total_weight = ensemble._total_model_weights()
+
+    batched = ensemble._candidate_scores(weighted_sum, total_weight)
+    per_candidate = []
+    for model in ensemble.model_library:
+        predictions = model.predictions.astype(np.float32)
+        if scipy.sparse.issparse(predictions):
+            predictions = predictions.toarray()
+        candidate = (weighted_sum.reshape(predictions.shape) + predictions) / (
+            total_weight + 1
+        )
+        if scipy.sparse.issparse(model.predictions):
+            candidate = scipy.sparse.csr_matrix(candidate)
+        per_candidate.append(ensemble._ensemble_validation_score(candidate))
+
+    assert batched == pytest.approx(per_candidate)
+    ensemble.expand_ensemble(5)
+    assert 8 == ensemble._total_model_weights()
+
+
+@pytest.mark.parametrize("metric", ["neg_log_loss", "accuracy"])
+def test_batched_candidate_scores_classifier(metric):
+    y = pd.Series(np.random.RandomState(1).choice(["a", "b", "c"], size=200))
+
+    def predict(rng):
+        if metric == "accuracy":
+            return rng.choice(["a", "b", "c"], size=200)
+        probabilities = rng.random_sample((200, 3))
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    ensemble = _ensemble_with_random_library(EnsembleClassifier, metric, y, predict)
+    _assert_batched_scores_match_per_candidate(ensemble)
+
+
+def test_batched_candidate_scores_regressor():
+    y = pd.Series(np.random.RandomState(1).random_sample(200))
+    ensemble = _ensemble_with_random_library(
+        EnsembleRegressor,
+        "neg_mean_squared_error",
+        y,
+        lambda rng: rng.random_sample(200),
+    )
+    _assert_batched_scores_match_per_candidate(ensemble)
+
+
+def test_batched_candidate_scores_unsupported_metric():
+    y = pd.Series(np.random.RandomState(1).choice(["a", "b"], size=200))
+    ensemble = _ensemble_with_random_library(
+        EnsembleClassifier, "roc_auc", y, lambda rng: rng.random_sample((200, 2))
+    )
+    weighted_sum = np.zeros(ensemble.stacked_predictions.shape[1:])
+    assert ensemble._candidate_scores(weighted_sum, 0) is None
+    ensemble.expand_ensemble(5)
+    assert 8 == ensemble._total_model_weights()
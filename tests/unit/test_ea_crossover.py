@@ -24,6 +24,7 @@ def test_shared_terminals(SS_BNB, RS_MNB, GNB):
 def test_crossover_primitives(SS_BNB, RS_MNB):
     """Two individuals of at least length 2 produce two new ones with crossover."""
     ind1_copy, ind2_copy = SS_BNB.copy_as_new(), RS_MNB.copy_as_new()
+    _ = SS_BNB.structure_key, RS_MNB.structure_key  # Cached on the primitive nodes.
 
     # Cross-over is in-place
     crossover_primitives(SS_BNB, RS_MNB)
@@ -31,18 +32,22 @@ def test_crossover_primitives(SS_BNB, RS_MNB):
     all_individuals = [SS_BNB, RS_MNB, ind1_copy, ind2_copy]
 
     assert 4 == len({ind.pipeline_str() for ind in all_individuals})
+    assert 4 == len({ind.structure_key for ind in all_individuals})
     assert ind1_copy.pipeline_str() != SS_BNB.pipeline_str()
 
 
 def test_crossover_terminal(SS_BNB, RS_MNB):
     """Two individuals with shared Terminals produce two new ones with crossover."""
     ind1_copy, ind2_copy = SS_BNB.copy_as_new(), RS_MNB.copy_as_new()
+    _ = SS_BNB.structure_key, RS_MNB.structure_key  # Cached on the primitive nodes.
+
     # Cross-over is in-place
     crossover_terminals(SS_BNB, RS_MNB)
     # Both parents and children should be unique
     all_individuals = [SS_BNB, RS_MNB, ind1_copy, ind2_copy]
 
     assert 4 == len({ind.pipeline_str() for ind in all_individuals})
+    assert 4 == len({ind.structure_key for ind in all_individuals})
     assert ind1_copy.pipeline_str() != SS_BNB.pipeline_str()
 
 
@@ -255,10 +255,16 @@ def _test_mutation(individual: Individual, mutation, mutation_check, pset):
        see above functions.
     """
     ind_clone = individual.copy_as_new()
+    key_before_mutation = ind_clone.structure_key  # Cached on the primitive nodes.
     mutation(ind_clone, pset)
 
     applied, message = mutation_check(individual, ind_clone)
     assert applied, message
 
+    # The cached key should be cleared by the mutation.
+    assert key_before_mutation != ind_clone.structure_key
+    parsed = Individual.from_string(ind_clone.pipeline_str(), pset)
+    assert parsed.structure_key == ind_clone.structure_key
+
     # Should be able to compile the individual, will raise an Exception if not.
     compile_individual(ind_clone, pset)
@@ -180,3 +180,24 @@ def test_evaluation_library_sample_pd1d_prediction(GNB):
         subsample=probabilities.iloc[[0, 1, 3]],
         individual=GNB,
     )
+
+
+def test_evaluation_to_disk_memory_maps_predictions(GNB, tmp_path):
+    predictions = np.random.random(size=(30, 5))
+    evaluation = _mock_evaluation(GNB, predictions, estimators=["estimator"])
+    evaluation.to_disk(str(tmp_path))
+    assert evaluation._predictions is None and evaluation._estimators == []
+
+    assert isinstance(evaluation.predictions, np.memmap), "Predictions not mapped."
+    np.testing.assert_array_equal(predictions, evaluation.predictions)
+    assert ["estimator"] == evaluation.estimators
+
+    evaluation.remove_from_disk()
+    assert [] == list(tmp_path.iterdir()), "Not all files were removed."
+
+
+def test_evaluation_to_disk_object_predictions(GNB, tmp_path):
+    predictions = np.array(["a", "b", 3], dtype=object)
+    evaluation = _mock_evaluation(GNB, predictions)
+    evaluation.to_disk(str(tmp_path))
+    np.testing.assert_array_equal(predictions, evaluation.predictions)
@@ -0,0 +1,82 @@
+import pickle
+
+import pandas as pd
+from sklearn.datasets import load_iris
+
+from gama.genetic_programming.compilers.scikitlearn import evaluate_individual
+from gama.utilities import evaluation_store
+from gama.utilities.evaluation_store import EVALUATION_VERSION, EvaluationStore
+from gama.utilities.metrics import scoring_to_metric
+
+
+def _iris_store(path, metric="accuracy", n_rows=150):
+    x, y = load_iris(return_X_y=True, as_frame=True)
+    return EvaluationStore(path, x[:n_rows], y[:n_rows], scoring_to_metric(metric))
+
+
+def test_evaluation_store_save_and_get(tmp_path):
+    store = _iris_store(str(tmp_path / "store.db"))
+    assert store.get("GaussianNB(data)") is None
+
+    store.save("GaussianNB(data)", (0.9,), duration=1.0)
+    store.save("GaussianNB(data)", (0.5,), duration=1.0, subsample=50)
+    assert (0.9,) == store.get("GaussianNB(data)")
+    assert (0.5,) == store.get("GaussianNB(data)", subsample=50)
+    assert [("GaussianNB(data)", (0.9,))] == store.all_scores()
+
+    # Scores are kept across runs, and the store can be sent to other processes.
+    same_context = pickle.loads(pickle.dumps(_iris_store(str(tmp_path / "store.db"))))
+    assert (0.9,) == same_context.get("GaussianNB(data)")
+
+
+def test_evaluation_store_context(tmp_path):
+    path = str(tmp_path / "store.db")
+    _iris_store(path).save("GaussianNB(data)", (0.9,), duration=1.0)
+
+    assert _iris_store(path, metric="neg_log_loss").get("GaussianNB(data)") is None
+    assert _iris_store(path, n_rows=100).get("GaussianNB(data)") is None
+
+
+def test_evaluation_store_keeps_fractional_subsamples_apart(tmp_path):
+    store = _iris_store(str(tmp_path / "store.db"))
+    store.save("GaussianNB(data)", (0.5,), duration=1.0, subsample=0.125)
+    store.save("GaussianNB(data)", (0.7,), duration=1.0, subsample=0.375)
+    assert (0.5,) == store.get("GaussianNB(data)", subsample=0.125)
+    assert (0.7,) == store.get("GaussianNB(data)", subsample=0.375)
+
+
+def test_evaluation_store_ignores_scores_of_other_evaluation_versions(
+    tmp_path, monkeypatch
+):
+    path = str(tmp_path / "store.db")
+    _iris_store(path).save("GaussianNB(data)", (0.9,), duration=1.0)
+
+    monkeypatch.setattr(evaluation_store, "EVALUATION_VERSION", EVALUATION_VERSION + 1)
+    assert _iris_store(path).get("GaussianNB(data)") is None
+
+
+def test_evaluation_store_returns_nothing_if_store_can_not_be_read(tmp_path):
+    store = _iris_store(str(tmp_path / "store.db"))
+    store.save("GaussianNB(data)", (0.9,), duration=1.0)
+    store._connect().execute("DROP TABLE evaluations")
+
+    assert store.get("GaussianNB(data)") is None
+    assert [] == store.all_scores()
+
+
+def test_evaluate_individual_with_evaluation_store(SS_BNB, tmp_path):
+    store = _iris_store(str(tmp_path / "store.db"))
+    calls = []
+
+    def fake_evaluate_pipeline(pipeline, *args, **kwargs):
+        calls.append(pipeline)
+        return pd.Series([1, 0]), (1.0,), [], None
+
+    first = evaluate_individual(SS_BNB, fake_evaluate_pipeline, evaluation_store=store)
+    second = evaluate_individual(
+        SS_BNB.copy_as_new(), fake_evaluate_pipeline, evaluation_store=store
+    )
+
+    assert 1 == len(calls), "The second evaluation should use the stored score."
+    assert first.score == second.score == (1.0, -2)
+    assert second.predictions is None
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from gama.search_methods.asha import _Bracket
+from gama.search_methods.hyperband import (
+    MIN_PAIRS,
+    MIN_WEIGHT,
+    bracket_weights,
+    rank_correlation,
+)
+
+
+def _brackets(max_rung=2):
+    resources = {rung: 3.0 ** (rung - max_rung) for rung in range(max_rung + 1)}
+    return [
+        _Bracket(
+            {rung: resources[rung] for rung in range(s, max_rung + 1)},
+            reduction_factor=3,
+            max_eval_time=100,
+        )
+        for s in range(max_rung + 1)
+    ]
+
+
+def test_rank_correlation():
+    scores = np.arange(MIN_PAIRS, dtype=float)
+    assert 1.0 == rank_correlation(list(zip(scores[:3], -scores[:3]))), "Too few."
+    assert 1.0 == pytest.approx(rank_correlation(list(zip(scores, scores**2))))
+    assert 0.0 == rank_correlation(list(zip(scores, -scores)))
+
+
+def test_bracket_weights_follow_rank_correlation_of_rungs():
+    scores = np.arange(MIN_PAIRS, dtype=float)
+    brackets = _brackets()
+    assert [1.0, 1.0, 1.0] == bracket_weights(brackets, max_rung=2)
+
+    # Scores on rung 0 agree with those on rung 1, so bracket 0 can rely on rung 0.
+    brackets[0].rung_pairs[0].extend(zip(scores, scores))
+    # Scores on rung 1 rank individuals in reverse of rung 2, pooled over brackets.
+    brackets[0].rung_pairs[1].extend(zip(scores[:5], -scores[:5]))
+    brackets[1].rung_pairs[1].extend(zip(scores[5:], -scores[5:]))
+
+    weights = bracket_weights(brackets, max_rung=2)
+    assert [MIN_WEIGHT, MIN_WEIGHT, 1.0] == weights, "Only bracket 2 skips rung 1."
+
+    brackets = _brackets()
+    brackets[0].rung_pairs[0].extend(zip(scores, scores))
+    brackets[1].rung_pairs[1].extend(zip(scores, scores + 1))
+    assert [1.0, 1.0, 1.0] == pytest.approx(bracket_weights(brackets, max_rung=2))
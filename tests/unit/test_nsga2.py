@@ -1,9 +1,16 @@
 from typing import List, Tuple
+
+import numpy as np
+
 from gama.genetic_programming.nsga2 import (
     NSGAMeta,
+    NSGAPopulation,
     fast_non_dominated_sort,
     crowding_distance_assignment,
+    _dominance_matrix_front_indices,
+    _two_objective_front_indices,
 )
+from gama.utilities.generic.paretofront import ParetoFront
 
 
 def _tuples_to_NSGAMeta(tuples: List[Tuple]) -> List[NSGAMeta]:
@@ -69,3 +76,56 @@ def test_crowd_compare():
 
     assert all([three_five.crowd_compare(other) == -1 for other in pareto[2:]])
     assert all([five_three.crowd_compare(other) == -1 for other in pareto[2:]])
+
+
+def test_fast_non_dominated_sort():
+    pareto = _tuples_to_NSGAMeta([(1, 1), (2, 2), (3, 5), (5, 3), (2, 4), (3, 3)])
+    one_one, two_two, three_five, five_three, two_four, three_three = pareto
+    fronts = fast_non_dominated_sort(pareto)
+
+    # Only elements which are better in all values dominate.
+    assert [three_five, five_three, three_three] == fronts[0]
+    # Ordered by the last element of the previous front which dominates them.
+    assert [two_four, two_two] == fronts[1]
+    assert [[one_one], []] == fronts[2:]
+    # The first two fronts share rank 1.
+    assert [1, 1, 1, 1, 1, 2] == [p.rank for p in fronts[0] + fronts[1] + fronts[2]]
+
+
+def test_two_objective_front_indices_match_dominance_matrix():
+    rng = np.random.RandomState(0)
+    for _ in range(50):
+        # Few distinct values, so there are many ties.
+        values = rng.randint(0, 5, size=(rng.randint(1, 40), 2)).astype(float)
+        values[rng.random_sample(len(values)) < 0.1, 0] = -np.inf
+        np.testing.assert_array_equal(
+            _dominance_matrix_front_indices(values),
+            _two_objective_front_indices(values),
+        )
+
+
+def test_nsga_population_matches_fast_non_dominated_sort():
+    rng = np.random.RandomState(0)
+    items: List[Tuple] = []
+    population = NSGAPopulation(items)
+    for _ in range(200):
+        if len(items) > 0 and rng.random_sample() < 0.4:
+            population.remove(items[rng.randint(len(items))])
+        else:
+            # Few distinct values, so there are many ties and duplicates.
+            population.append(tuple(rng.randint(0, 4, size=2).astype(float)))
+
+        if len(items) > 0:
+            pareto = _tuples_to_NSGAMeta(items)
+            fast_non_dominated_sort(pareto)
+            assert [p.rank for p in pareto] == list(population.ranks)
+            worst = ParetoFront(items, lambda t: tuple(-v for v in t))
+            assert list(worst) == population.worst_front()
+
+
+def test_nsga_population_crowding_distance():
+    population = NSGAPopulation([(3, 5), (5, 3), (4, 4), (1, 1)])
+    assert [float("inf"), float("inf"), 2, float("inf")] == list(population.distances)
+
+    population.remove((5, 3))
+    assert [float("inf"), float("inf"), float("inf")] == list(population.distances)
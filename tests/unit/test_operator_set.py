@@ -0,0 +1,103 @@
+from functools import partial
+
+from gama.genetic_programming.compilers.scikitlearn import failed_evaluation
+from gama.genetic_programming.operator_set import OperatorSet
+from gama.utilities.generic.async_evaluator import AsyncFuture
+
+
+class _OutOfMemoryEvaluator:
+    """Fakes an AsyncEvaluator of which each worker runs out of memory."""
+
+    exception = MemoryError
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args, time_limit=None, priority=0, **kwargs):
+        future = AsyncFuture(fn, *args, **kwargs)
+        future.priority = priority
+        self.submitted.append(future)
+        return future
+
+    def wait_next(self):
+        future = self.submitted[-1]
+        future.exception = self.exception()
+        return future
+
+
+def _operator_set(**kwargs):
+    return OperatorSet(
+        mutate=None,
+        mate=None,
+        create_from_population=None,
+        create_new=None,
+        compile_=None,
+        eliminate=None,
+        **{"evaluate_callback": None, **kwargs},
+    )
+
+
+def test_wait_next_retries_memory_error_once_with_less_data(GNB):
+    async_ = _OutOfMemoryEvaluator()
+    async_.submit(print, GNB, subsample=100)
+
+    future = _operator_set(retry_memory_errors=True).wait_next(async_)
+    assert isinstance(future.exception, MemoryError)
+    assert 2 == len(async_.submitted), "Evaluation should be retried exactly once."
+    assert 50 == async_.submitted[-1].kwargs["subsample"]
+
+
+def test_wait_next_retries_with_same_priority_and_reports_failures(GNB):
+    async_ = _OutOfMemoryEvaluator()
+    async_.submit(print, GNB, priority=2)
+    reported = []
+    operator_set = _operator_set(
+        retry_memory_errors=True, evaluate_callback=reported.append
+    )
+    operator_set.failed_evaluation = partial(failed_evaluation, n_metrics=1)
+
+    operator_set.wait_next(async_)
+    assert 2 == async_.submitted[-1].priority
+    assert 2 == len(reported), "Both terminated evaluations should be reported."
+    assert all("MemoryError" in evaluation.error for evaluation in reported)
+    assert (float("-inf"), -1) == reported[0].score
+
+
+def test_wait_next_does_not_retry_if_search_depends_on_data(GNB):
+    async_ = _OutOfMemoryEvaluator()
+    async_.submit(print, GNB)
+
+    operator_set = _operator_set(retry_memory_errors=True)
+    operator_set.wait_next(async_, retry_memory_errors=False)
+    assert 1 == len(async_.submitted)
+
+
+def test_wait_next_does_not_retry_memory_error_by_default(GNB):
+    async_ = _OutOfMemoryEvaluator()
+    async_.submit(print, GNB)
+
+    future = _operator_set().wait_next(async_)
+    assert isinstance(future.exception, MemoryError)
+    assert 1 == len(async_.submitted)
+
+
+class _TimeoutEvaluator(_OutOfMemoryEvaluator):
+    """Fakes an AsyncEvaluator of which each worker exceeds its time limit."""
+
+    exception = TimeoutError
+
+
+def test_wait_next_reports_timed_out_evaluation_without_retry(GNB):
+    async_ = _TimeoutEvaluator()
+    async_.submit(print, GNB)
+    reported = []
+    operator_set = _operator_set(
+        retry_memory_errors=True, evaluate_callback=reported.append
+    )
+    operator_set.failed_evaluation = partial(failed_evaluation, n_metrics=1)
+
+    future = operator_set.wait_next(async_)
+    assert isinstance(future.exception, TimeoutError)
+    assert 1 == len(async_.submitted), "Timed out evaluations are not retried."
+    assert 1 == len(reported)
+    assert "TimeoutError" in reported[0].error
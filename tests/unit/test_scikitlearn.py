@@ -1,10 +1,23 @@
+from functools import partial
+
+import numpy as np
 import pandas as pd
-from sklearn.datasets import load_iris
+import pytest
+from sklearn.datasets import load_diabetes, load_iris
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import cross_val_predict, cross_validate
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from gama.genetic_programming.compilers.fold_cache import FoldCache
+from gama.genetic_programming.compilers.prefix_cache import CachedPrefix, PrefixCache
 from gama.genetic_programming.compilers.scikitlearn import (
     evaluate_individual,
     compile_individual,
     evaluate_pipeline,
+    RaceAborted,
 )
+from gama.genetic_programming.components import Individual
 from gama.utilities.metrics import scoring_to_metric
 
 
@@ -79,3 +92,212 @@ def test_evaluate_invalid_pipeline(InvalidLinearSVC):
     assert str(error).endswith("penalty='l1', loss='squared_hinge', dual=True")
     assert estimators is None
     assert prediction is None
+
+
+@pytest.mark.parametrize(
+    "scoring", [("neg_log_loss",), ("accuracy",), ("neg_log_loss", "accuracy")]
+)
+def test_evaluate_pipeline_matches_cross_validate(SS_BNB, scoring):
+    x, y = load_iris(return_X_y=True, as_frame=True)
+    _assert_matches_cross_validate(SS_BNB.pipeline, x, y, scoring)
+
+
+def test_evaluate_pipeline_matches_cross_validate_for_regression():
+    x, y = load_diabetes(return_X_y=True, as_frame=True)
+    pipeline = Pipeline([("0", StandardScaler()), ("1", Ridge())])
+    _assert_matches_cross_validate(pipeline, x, y, ("neg_mean_squared_error", "r2"))
+
+
+def _assert_matches_cross_validate(pipeline, x, y, scoring):
+    metrics = scoring_to_metric(scoring)
+    prediction, scores, estimators, error = evaluate_pipeline(
+        pipeline, x, y, timeout=60, metrics=metrics
+    )
+    assert error is None
+
+    expected = cross_validate(pipeline, x, y, cv=5, scoring=list(scoring))
+    np.testing.assert_allclose(
+        [np.mean(expected[f"test_{name}"]) for name in scoring], scores
+    )
+    method = (
+        "predict_proba" if any(m.requires_probabilities for m in metrics) else "predict"
+    )
+    expected_prediction = cross_val_predict(pipeline, x, y, cv=5, method=method)
+    np.testing.assert_allclose(expected_prediction, prediction)
+    assert 5 == len(estimators)
+
+
+def test_evaluate_pipeline_racing(SS_BNB):
+    x, y = load_iris(return_X_y=True)
+    x, y = pd.DataFrame(x), pd.Series(y)
+    evaluate = partial(
+        evaluate_pipeline,
+        SS_BNB.pipeline,
+        x,
+        y,
+        timeout=60,
+        metrics=scoring_to_metric("accuracy"),
+    )
+
+    prediction, scores, estimators, error = evaluate(race_threshold=0.0)
+    assert error is None, "Pipeline can reach the threshold."
+    assert 5 == len(estimators)
+
+    prediction, scores, estimators, error = evaluate(race_threshold=2.0)
+    assert isinstance(error, RaceAborted)
+    assert "Aborted after 2 folds." == str(error), "Should abort as soon as possible."
+    assert 1 == len(scores) and 0 <= scores[0] <= 1
+    assert prediction is None and estimators is None
+
+    evaluation = evaluate_individual(
+        SS_BNB,
+        evaluate_pipeline=evaluate_pipeline,
+        x=x,
+        y_train=y,
+        metrics=scoring_to_metric("accuracy"),
+        race_threshold=2.0,
+    )
+    assert evaluation.race_aborted
+    assert evaluation.error is not None
+
+
+def test_evaluate_pipeline_subsample_uses_rows_of_train_fold(SS_BNB):
+    x, y = load_iris(return_X_y=True)
+    # Rows are sorted by class, a subsample of rows outside the train fold
+    # (or of its first rows) would miss classes.
+    x, y = pd.DataFrame(x, index=np.arange(150) + 1000), pd.Series(y)
+    y.index = x.index
+    _, scores, estimators, error = evaluate_pipeline(
+        SS_BNB.pipeline,
+        x,
+        y,
+        timeout=60,
+        metrics=scoring_to_metric("accuracy"),
+        subsample=0.5,
+    )
+    assert error is None
+    assert all(3 == len(estimator.classes_) for estimator in estimators)
+
+
+def test_evaluate_pipeline_reuses_folds(SS_BNB, tmp_path):
+    x, y = load_iris(return_X_y=True)
+    x, y = pd.DataFrame(x), pd.Series(y)
+    cache = FoldCache(str(tmp_path / "folds"))
+    evaluate = partial(
+        evaluate_pipeline,
+        SS_BNB.pipeline,
+        x,
+        y,
+        timeout=60,
+        metrics=scoring_to_metric("accuracy"),
+        fold_cache=cache,
+        fold_key=SS_BNB.pipeline_str(),
+    )
+
+    prediction, _, estimators, error = evaluate(n_folds=0.4)
+    assert error is None
+    assert prediction is None, "Not all rows are predicted."
+    assert 2 == len(estimators)
+
+    key = (SS_BNB.pipeline_str(), None, 0)
+    cache.put(key, cache.get(key)._replace(scores=[10.0]))
+    prediction, scores, estimators, error = evaluate()
+    assert error is None
+    assert (150,) == prediction.shape
+    assert 5 == len(estimators)
+    assert scores[0] > 2, "The score of the stored fold should be used."
+    # Only the evaluated folds are stored, not those of the full evaluation.
+    assert 2 == len(list((tmp_path / "folds").iterdir()))
+
+
+def test_evaluate_pipeline_does_not_store_folds_of_subsamples(SS_BNB, tmp_path):
+    x, y = load_iris(return_X_y=True)
+    x, y = pd.DataFrame(x), pd.Series(y)
+    cache = FoldCache(str(tmp_path / "folds"))
+    *_, error = evaluate_pipeline(
+        SS_BNB.pipeline,
+        x,
+        y,
+        timeout=60,
+        metrics=scoring_to_metric("accuracy"),
+        subsample=0.5,
+        n_folds=0.4,
+        fold_cache=cache,
+        fold_key=SS_BNB.pipeline_str(),
+    )
+    assert error is None
+    # E.g. the next rung with resource "both" uses more rows, so it can not reuse them.
+    assert not (tmp_path / "folds").exists()
+
+
+def test_evaluate_pipeline_warm_start_continues_training(SS_BNB, pset, tmp_path):
+    x, y = load_iris(return_X_y=True)
+    x, y = pd.DataFrame(x), pd.Series(y)
+    gnb = Individual.from_string("GaussianNB(data)", pset, compile_individual)
+    cache = FoldCache(str(tmp_path / "folds"))
+    evaluate = partial(
+        evaluate_pipeline,
+        x=x,
+        y_train=y,
+        timeout=60,
+        metrics=scoring_to_metric("accuracy"),
+        fold_cache=cache,
+        warm_start=True,
+    )
+
+    # `partial_fit` can not be used after preprocessing was fit on other rows.
+    evaluate(SS_BNB.pipeline, fold_key=SS_BNB.pipeline_str(), subsample=0.3)
+    assert not (tmp_path / "folds").exists()
+
+    *_, error = evaluate(gnb.pipeline, fold_key=gnb.pipeline_str(), subsample=0.3)
+    assert error is None
+    assert 5 == len(list((tmp_path / "folds").iterdir()))
+    previous = cache.get((gnb.pipeline_str(), "warm_start", 0))
+    assert 36 == previous.n_rows == previous.estimator.class_count_.sum()
+
+    _, scores, estimators, error = evaluate(gnb.pipeline, fold_key=gnb.pipeline_str())
+    _, _, from_scratch, _ = evaluate_pipeline(
+        gnb.pipeline, x, y, timeout=60, metrics=scoring_to_metric("accuracy")
+    )
+    assert error is None
+    # The rows of the subsample are not learned twice.
+    assert 120 == estimators[0].steps[-1][1].class_count_.sum()
+    np.testing.assert_allclose(
+        from_scratch[0].steps[-1][1].theta_, estimators[0].steps[-1][1].theta_
+    )
+
+
+def test_evaluate_individual_with_prefix_cache(SS_BNB, pset):
+    x, y = load_iris(return_X_y=True)
+    x, y = pd.DataFrame(x), pd.Series(y)
+    evaluate = partial(
+        evaluate_pipeline, x=x, y_train=y, metrics=scoring_to_metric("accuracy")
+    )
+    uncached = evaluate_individual(SS_BNB, evaluate, timeout=60)
+
+    cache = PrefixCache(max_mb=10)
+    first = evaluate_individual(SS_BNB, evaluate, timeout=60, prefix_cache=cache)
+    assert (0, 5) == (first.cache_hits, first.cache_misses)
+    assert uncached.score == first.score
+    np.testing.assert_array_equal(uncached.predictions, first.predictions)
+
+    # Same preprocessing, different final estimator:
+    other = Individual.from_string(
+        "GaussianNB(StandardScaler(data))", pset, compile_individual
+    )
+    second = evaluate_individual(other, evaluate, timeout=60, prefix_cache=cache)
+    assert (5, 0) == (second.cache_hits, second.cache_misses)
+    assert 5 == len(second.estimators)
+
+
+def test_prefix_cache_evicts_least_recently_used():
+    one_mb = np.zeros(2**20, dtype=np.uint8)
+    cache = PrefixCache(max_mb=2.5)
+    cache.put("a", CachedPrefix([], one_mb, np.zeros(0)))
+    cache.put("b", CachedPrefix([], one_mb, np.zeros(0)))
+    assert cache.get("a") is not None  # "b" is now least recently used
+    cache.put("c", CachedPrefix([], one_mb, np.zeros(0)))
+
+    assert 2 == len(cache)
+    assert cache.get("b") is None
+    assert (1, 1) == (cache.hits, cache.misses)
@@ -1,6 +1,7 @@
 import pytest
 
 from gama.genetic_programming.components import Fitness
+from gama.genetic_programming.nsga2 import NSGAPopulation
 from gama.genetic_programming.selection import (
     create_from_population,
     eliminate_from_pareto,
@@ -41,3 +42,19 @@ def test_create_from_population(opset, GNB, ForestPipeline, LinearSVC):
     # Not sure how to test NSGA2 selection is applied correctly
     # Can do it many times and see if the best individuals are parent more
     # With these fixtures, crossover can't be tested either.
+
+
+def test_eliminate_and_create_with_nsga_population(
+    opset, GNB, ForestPipeline, LinearSVC
+):
+    GNB.fitness = Fitness((3, -2), 0, 0, 0)
+    ForestPipeline.fitness = Fitness((4, -2), 0, 0, 0)
+    LinearSVC.fitness = Fitness((3, -1), 0, 0, 0)
+    parents = [GNB, ForestPipeline, LinearSVC]
+    population = NSGAPopulation(parents, lambda ind: ind.fitness.values)
+
+    assert [GNB] == eliminate_from_pareto(pop=population, n=1)
+
+    new = create_from_population(opset, pop=population, n=1, cxpb=0.5, mutpb=0.5)
+    assert 1 == len(new)
+    assert new[0]._id not in map(lambda i: i._id, parents)
@@ -0,0 +1,254 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import psutil
+import pytest
+
+from gama.genetic_programming.compilers.prefix_cache import PrefixCache
+from gama.utilities.generic.async_evaluator import (
+    AUTHKEY_VARIABLE,
+    AsyncEvaluator,
+    remote_worker,
+)
+
+
+def _evaluator(**kwargs):
+    # Gama overwrites the defaults of AsyncEvaluator.__init__ on initialization,
+    # so explicitly set them here to be independent of other tests.
+    defaults = {
+        "n_workers": 1,
+        "memory_limit_mb": None,
+        "logfile": None,
+        "time_limit": None,
+        "worker_memory_limit_mb": None,
+        "max_tasks_per_worker": None,
+        "max_worker_rss_growth_mb": None,
+        "backend": "processes",
+    }
+    return AsyncEvaluator(**{**defaults, **kwargs})
+
+
+def _double(x):
+    return x * 2
+
+
+def _allocate(n_bytes):
+    return len(np.ones(n_bytes, dtype=np.uint8))
+
+
+_held = []
+
+
+def _allocate_and_hold(n_bytes):
+    _held.append(np.ones(n_bytes, dtype=np.uint8))
+    return os.getpid()
+
+
+def test_async_evaluator_wait_next_without_submit():
+    with _evaluator() as async_:
+        with pytest.raises(RuntimeError):
+            async_.wait_next()
+
+
+@pytest.mark.parametrize("backend", ["processes", "threads"])
+def test_async_evaluator_returns_results_without_polling_delay(backend, monkeypatch):
+    with _evaluator(backend=backend) as async_:
+        reads = []
+        get = async_._output.get
+
+        def counting_get(*args, **kwargs):
+            reads.append(kwargs)
+            return get(*args, **kwargs)
+
+        monkeypatch.setattr(async_._output, "get", counting_get)
+        for i in range(10):
+            async_.submit(_double, i)
+        results = {async_.wait_next(poll_time=60).result for _ in range(10)}
+
+    assert {i * 2 for i in range(10)} == results
+    # Polling would read (or try to read) the queue more often than once per result.
+    assert 10 == len(reads), "Should block on the queue until each result arrives."
+
+
+def test_async_evaluator_evaluates_highest_priority_first():
+    with _evaluator() as async_:
+        async_.submit(time.sleep, 0.3)  # Occupies the only worker.
+        for priority in [0, 2, 1, 2]:
+            async_.submit(_double, priority, priority=priority)
+        results = [async_.wait_next().result for _ in range(5)]
+    assert [None, 4, 4, 2, 0] == results
+
+
+def test_async_evaluator_passes_futures_to_idle_workers_only():
+    with _evaluator(n_workers=2) as async_:
+        assert -2 == async_.job_queue_size, "Both workers should be idle."
+        for _ in range(3):
+            async_.submit(time.sleep, 0.3)
+        assert 1 == async_.job_queue_size, "Only one future should wait."
+
+        async_.wait_next()
+        assert 0 == async_.job_queue_size, "The waiting future should be passed on."
+        async_.wait_next()
+        assert -1 == async_.job_queue_size
+
+
+def test_async_evaluator_monitor_logs_memory(tmp_path):
+    logfile = os.path.join(tmp_path, "memory.log")
+    with _evaluator(logfile=logfile, monitor_interval=0.05):
+        time.sleep(0.3)
+
+    with open(logfile, "r") as fh:
+        lines = fh.readlines()
+    # One line on start, and at least one more from the monitor.
+    assert len(lines) > 1
+
+
+def test_async_evaluator_terminates_worker_exceeding_time_limit():
+    with _evaluator(monitor_interval=0.05) as async_:
+        async_.submit(time.sleep, 60, time_limit=0.2)
+        start = time.time()
+        future = async_.wait_next()
+        assert time.time() - start < 10, "Worker should be terminated early."
+        assert isinstance(future.exception, TimeoutError)
+        assert future.result is None
+
+        # The terminated worker is replaced.
+        async_.submit(_double, 2)
+        assert 4 == async_.wait_next().result
+
+
+def test_async_evaluator_completes_future_of_worker_killed_for_memory():
+    # Any worker exceeds the limit, since the main process alone already does.
+    with _evaluator(memory_limit_mb=1, monitor_interval=0.05) as async_:
+        async_.submit(time.sleep, 60)
+        start = time.time()
+        future = async_.wait_next()
+        assert time.time() - start < 10, "Future should complete when worker is killed."
+        assert isinstance(future.exception, MemoryError)
+        assert async_.job_queue_size == -1, "Queue size should account for the kill."
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires a Unix-like system.")
+def test_async_evaluator_worker_memory_limit():
+    # Workers are forked, so they start with the address space of this process.
+    limit_mb = int(psutil.Process().memory_info().vms / 2**20) + 256
+    with _evaluator(worker_memory_limit_mb=limit_mb) as async_:
+        async_.submit(_allocate, 2**30)
+        assert isinstance(async_.wait_next().exception, MemoryError)
+
+        async_.submit(_allocate, 2**20)
+        assert 2**20 == async_.wait_next().result
+
+
+def test_async_evaluator_replaces_worker_after_max_tasks():
+    with _evaluator(max_tasks_per_worker=2, monitor_interval=0.05) as async_:
+        for _ in range(6):
+            async_.submit(os.getpid)
+        pids = [async_.wait_next().result for _ in range(6)]
+
+    assert 3 == len(set(pids)), "Each worker should complete exactly two tasks."
+
+
+def test_async_evaluator_replaces_worker_after_rss_growth():
+    with _evaluator(max_worker_rss_growth_mb=64, monitor_interval=0.05) as async_:
+        pids = []
+        for task, args in [
+            (os.getpid, ()),
+            (os.getpid, ()),
+            (_allocate_and_hold, (2**28,)),
+            (os.getpid, ()),
+        ]:
+            async_.submit(task, *args)
+            future = async_.wait_next()
+            assert future.exception is None
+            pids.append(future.result)
+
+    first, second, grown, replacement = pids
+    assert first == second == grown, "Workers should only be replaced after growth."
+    assert grown != replacement, "The grown worker should be replaced."
+
+
+def test_async_evaluator_threads_share_memory():
+    data = [1, 2, 3]
+    with _evaluator(n_workers=2, backend="threads") as async_:
+        async_.submit(id, data)
+        assert id(data) == async_.wait_next().result, "Arguments should not be copied."
+
+
+def test_async_evaluator_stops_busy_and_idle_threads():
+    with _evaluator(
+        n_workers=2, backend="threads", wait_time_before_forced_shutdown=0
+    ) as async_:
+        # Still busy after the evaluator stopped waiting for workers to stop.
+        async_.submit(time.sleep, 1.5)
+        workers = [t for t in threading.enumerate() if t.name == "gama-worker"]
+    assert 2 == len(workers)
+
+    for worker in workers:
+        worker.join(timeout=10)
+    alive = [t for t in threading.enumerate() if t.name == "gama-worker"]
+    assert [] == alive, "Threads should stop, also those busy on exit."
+
+
+def _ids(data, cache):
+    return id(data), id(cache)
+
+
+def test_async_evaluator_threads_share_defaults(monkeypatch):
+    data, cache = pd.DataFrame(np.zeros((10, 2))), PrefixCache(max_mb=1)
+    monkeypatch.setattr(AsyncEvaluator, "defaults", dict(data=data, cache=cache))
+    with _evaluator(backend="threads") as async_:
+        async_.submit(_ids)
+        data_id, cache_id = async_.wait_next().result
+    assert id(data) == data_id, "Data should not be copied."
+    assert id(cache) != cache_id, "Each thread should get its own cache."
+
+
+def _start_agents(address, n):
+    authkey = os.environ[AUTHKEY_VARIABLE].encode()
+    agents = [
+        multiprocessing.Process(target=remote_worker, args=(address, authkey))
+        for _ in range(n)
+    ]
+    for agent in agents:
+        agent.start()
+    return agents
+
+
+def _sleep_and_getpid(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def test_async_evaluator_tcp_backend(monkeypatch):
+    monkeypatch.setenv(AUTHKEY_VARIABLE, "secret")
+    with _evaluator(backend="tcp://localhost:0") as async_:
+        agents = _start_agents(async_.address, n=2)
+        for _ in range(6):
+            async_.submit(_sleep_and_getpid, 0.2)
+        pids = {async_.wait_next().result for _ in range(6)}
+    assert {agent.pid for agent in agents} == pids, "Both agents should evaluate."
+    for agent in agents:
+        agent.join(timeout=10)
+        assert agent.exitcode == 0, "Agents should stop when the evaluator closes."
+
+
+def test_async_evaluator_tcp_backend_requeues_lost_futures(monkeypatch):
+    monkeypatch.setenv(AUTHKEY_VARIABLE, "secret")
+    with _evaluator(backend="tcp://localhost:0") as async_:
+        (lost_agent,) = _start_agents(async_.address, n=1)
+        async_.submit(_sleep_and_getpid, 1)
+        time.sleep(0.5)
+        lost_agent.kill()
+        (agent,) = _start_agents(async_.address, n=1)
+        assert agent.pid == async_.wait_next().result
+
+
+def test_async_evaluator_tcp_backend_requires_authkey(monkeypatch):
+    monkeypatch.delenv(AUTHKEY_VARIABLE, raising=False)
+    with pytest.raises(ValueError):
+        _evaluator(backend="tcp://localhost:0")
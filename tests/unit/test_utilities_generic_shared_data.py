@@ -0,0 +1,48 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gama.utilities.generic.shared_data import SharedData
+
+
+def test_shared_data_homogeneous_dataframe(tmp_path):
+    df = pd.DataFrame(np.random.random((20, 3)), columns=["a", "b", "c"])
+    shared = SharedData(df, str(tmp_path / "x.dat"))
+
+    unpickled = pickle.loads(pickle.dumps(shared))
+    pd.testing.assert_frame_equal(df, unpickled.data)
+    assert unpickled.data._mgr.nblocks == 1, "Columns should form a single block."
+
+
+def test_shared_data_mixed_dataframe(tmp_path):
+    df = pd.DataFrame(
+        {
+            "float": np.random.random(10).astype(np.float32),
+            "int": np.arange(10),
+            "cat": pd.Categorical(list("abcdeabcde")),
+        },
+        index=np.arange(10, 20),
+    )
+    shared = SharedData(df, str(tmp_path / "x.dat"))
+    pd.testing.assert_frame_equal(df, pickle.loads(pickle.dumps(shared)).data)
+
+
+def test_shared_data_series(tmp_path):
+    series = pd.Series(np.arange(10), name="target")
+    shared = SharedData(series, str(tmp_path / "y.dat"))
+    pd.testing.assert_series_equal(series, pickle.loads(pickle.dumps(shared)).data)
+
+
+def test_shared_data_pickles_header_only(tmp_path):
+    df = pd.DataFrame(np.random.random((10_000, 10)))
+    shared = SharedData(df, str(tmp_path / "x.dat"))
+    _ = shared.data  # Loaded data should not be pickled either.
+    assert len(pickle.dumps(shared)) < len(pickle.dumps(df)) / 100
+
+
+def test_shared_data_object_dtype_raises(tmp_path):
+    df = pd.DataFrame({"a": ["x", "y", "z"]})
+    with pytest.raises(TypeError):
+        SharedData(df, str(tmp_path / "x.dat"))
@@ -0,0 +1,34 @@
+import multiprocessing
+import socket
+import threading
+
+from gama.utilities.worker import _run_agent
+
+
+def test_agent_reconnects_after_connection_drops_during_handshake():
+    server = socket.socket()
+    server.bind(("localhost", 0))
+    server.listen()
+    server.settimeout(10)
+    accepted = []
+
+    def drop_connections():
+        for _ in range(3):
+            connection, _ = server.accept()
+            connection.close()  # Before the authentication challenge is sent.
+            accepted.append(connection)
+
+    dropper = threading.Thread(target=drop_connections, daemon=True)
+    dropper.start()
+    agent = multiprocessing.Process(
+        target=_run_agent, args=(*server.getsockname(), b"secret", 0.05)
+    )
+    agent.start()
+    try:
+        dropper.join(timeout=10)
+        assert agent.is_alive(), "The agent should not stop on a dropped connection."
+        assert 3 == len(accepted), "The agent should keep connecting."
+    finally:
+        agent.terminate()
+        agent.join()
+        server.close()